@@ -1,23 +1,67 @@
-from .lexer import *
-from .linker import *
-from .parser import *
+from typing import Dict, Iterator
+
+from .ast_case import ASTCase
+from .ast_divmod import ASTDivmod
+from .ast_iadd_int import ASTIaddInt
+from .ast_iadd_var import ASTIaddVar
+from .ast_idiv_int import ASTIdivInt
+from .ast_idiv_var import ASTIdivVar
+from .ast_if import ASTIf
+from .ast_if_elif import ASTIfElif
+from .ast_ilshift_int import ASTIlshiftInt
+from .ast_ilshift_var import ASTIlshiftVar
+from .ast_imod_int import ASTImodInt
+from .ast_imod_var import ASTImodVar
+from .ast_imul_int import ASTImulInt
+from .ast_imul_var import ASTImulVar
+from .ast_irshift_int import ASTIrshiftInt
+from .ast_irshift_var import ASTIrshiftVar
+from .ast_isub_int import ASTIsubInt
+from .ast_isub_var import ASTIsubVar
+from .ast_list_get_var import ASTListGetVar
+from .ast_list_set_var import ASTListSetVar
+from .ast_set_int import ASTSetInt
+from .ast_set_var import ASTSetVar
+from .base_ast import ASTAssembler, ASTGoto, ASTIn, ASTOut, ASTWhile
+from .c_linker import CLinker
+from .code_ast import ASTFile
+from .code_buffer import CodeBuffer
+from .code_getters import IndexGetter, VarGetter
+from .code_stack import Stack
+from .code_var import CodeVar
+from .compiler import Compiler, TARGETS
+from .declaration_ast import ASTIntDeclaration, ASTStringDeclaration
+from .goto import Goto
+from .ideclaration import IDeclaration
+from .iprocessable import IProcessable
+from .lexer import CodeLexer
+from .linker import CodeLinker
+from .optimizer import CodeOptimizer
+from .parser import CodeParser
 from .preprocessor import Preprocessor
+from .util import bf_move
+
+__all__ = [
+    "ASTAssembler", "ASTCase", "ASTDivmod", "ASTFile", "ASTGoto", "ASTIaddInt", "ASTIaddVar", "ASTIdivInt",
+    "ASTIdivVar", "ASTIf", "ASTIfElif", "ASTIlshiftInt", "ASTIlshiftVar", "ASTImodInt", "ASTImodVar", "ASTImulInt",
+    "ASTImulVar", "ASTIn", "ASTIntDeclaration", "ASTIrshiftInt", "ASTIrshiftVar", "ASTIsubInt", "ASTIsubVar",
+    "ASTListGetVar", "ASTListSetVar", "ASTOut", "ASTSetInt", "ASTSetVar", "ASTStringDeclaration", "ASTWhile",
+    "CLinker", "CodeBuffer", "CodeLexer", "CodeLinker", "CodeOptimizer", "CodeParser", "CodeVar", "Compiler",
+    "Goto", "IDeclaration", "IProcessable", "IndexGetter", "Preprocessor", "Stack", "TARGETS", "VarGetter",
+    "bf_move", "compile_code", "compile_code_chunks", "create_linker",
+]
 
 
-def compile_code(data: str, definitions: Dict[str, str] = None) -> str:
-    if definitions is None:
-        definitions = {}
-    definitions_2: Dict[str, List] = {}
-    for i, f in definitions.items():
-        lexer_ = CodeLexer()
-        lexer_.lexer.input(f)
-        definitions_2[i] = list(lexer_.lexer)
+def create_linker(data: str, definitions: Dict[str, str] = None, optimize: int = 0,
+                  target: str = "bf", evaluate: int = 0) -> CodeLinker:
+    return Compiler(optimize, target, evaluate).linker(data, definitions)
 
-    code_parser = CodeParser(CodeLexer.tokens, CodeLexer.literals)
 
-    a: ASTFile = (code_parser.parse(input=data + "\n", lexer=Preprocessor(declarations=definitions_2)))
+def compile_code_chunks(data: str, definitions: Dict[str, str] = None, optimize: int = 0,
+                        target: str = "bf", evaluate: int = 0) -> Iterator[str]:
+    return create_linker(data, definitions, optimize, target, evaluate).iter_chunks()
 
-    if not code_parser.parser.errorok:
-        raise Exception
 
-    return CodeLinker(a).process()
+def compile_code(data: str, definitions: Dict[str, str] = None, optimize: int = 0, target: str = "bf",
+                 evaluate: int = 0) -> str:
+    return "".join(compile_code_chunks(data, definitions, optimize, target, evaluate))
@@ -0,0 +1,90 @@
+import heapq
+from typing import Dict, List, Union, Tuple, Optional
+
+from .code_getters import IndexGetter, VarGetter
+from .code_var import CodeVar
+from .goto import Goto
+
+
+class StackAllocator:
+    """Reassigns stack temporaries by the interval coloring of their lifetimes.
+
+    Every Stack.push returns a fresh getter, so each temporary is identified in the code queue by its getter object.
+    Its lifetime runs from the first to the last Goto using it, widened to whole loops it is partially live in, as the
+    value may be carried over the back edge. Temporaries with disjoint lifetimes share a cell.
+    """
+
+    def __init__(self, code: List[Union[Goto, str]], declarations: Dict[str, CodeVar], stack: str = "__stack"):
+        self.code: List[Union[Goto, str]] = code
+        self.declarations: Dict[str, CodeVar] = declarations
+        self.stack: str = stack
+
+        # loop id -> [open index, close index, parent loop id]
+        self.loops: Dict[int, List] = {}
+        # temporary -> [first index, innermost loop at first, last index, innermost loop at last]
+        self.temps: Dict[int, List] = {}
+        self.colors: Dict[int, int] = {}
+
+    def is_temp(self, var) -> bool:
+        return isinstance(var, IndexGetter) and isinstance(var.getter, VarGetter) and var.getter.name == self.stack
+
+    def process(self) -> List[Union[Goto, str]]:
+        if not self.scan():
+            return self.code
+        self.color()
+        getters = [IndexGetter(VarGetter(self.stack), i) for i in range(len(set(self.colors.values())))]
+        return [
+            Goto(getters[self.colors[id(i.var)]]) if isinstance(i, Goto) and self.is_temp(i.var) else i
+            for i in self.code
+        ]
+
+    def scan(self) -> bool:
+        current: Optional[int] = None
+        for n, i in enumerate(self.code):
+            if isinstance(i, str):
+                for f in i:
+                    if f == "[":
+                        self.loops[len(self.loops)] = [n, None, current]
+                        current = len(self.loops) - 1
+                    elif f == "]":
+                        if current is None:
+                            return False
+                        self.loops[current][1] = n
+                        current = self.loops[current][2]
+                continue
+            if not self.is_temp(i.var):
+                continue
+            if id(i.var) not in self.temps.keys():
+                self.temps[id(i.var)] = [n, current, n, current]
+            self.temps[id(i.var)][2:] = [n, current]
+        return current is None
+
+    def chain(self, loop: Optional[int]) -> List[int]:
+        data = []
+        while loop is not None:
+            data.append(loop)
+            loop = self.loops[loop][2]
+        return data
+
+    def lifetime(self, first: int, first_loop: Optional[int], last: int, last_loop: Optional[int]) -> Tuple[int, int]:
+        first_chain = self.chain(first_loop)
+        last_chain = self.chain(last_loop)
+        first_set, last_set = set(first_chain), set(last_chain)
+        outer = [i for i in first_chain if i not in last_set]
+        if len(outer) != 0:
+            first = self.loops[outer[-1]][0]
+        outer = [i for i in last_chain if i not in first_set]
+        if len(outer) != 0:
+            last = self.loops[outer[-1]][1]
+        return first, last
+
+    def color(self) -> None:
+        lifetimes = sorted((self.lifetime(*f), i) for i, f in self.temps.items())
+        active: List[Tuple[int, int]] = []
+        free: List[int] = []
+        for (first, last), temp in lifetimes:
+            while len(active) != 0 and active[0][0] < first:
+                heapq.heappush(free, heapq.heappop(active)[1])
+            color = heapq.heappop(free) if len(free) != 0 else len(active)
+            self.colors[temp] = color
+            heapq.heappush(active, (last, color))
@@ -1,28 +1,65 @@
 from typing import List, Tuple, Dict
 
-from .ast_if_elif import ASTIfElif
 from .ast_isub_int import ASTIsubInt
+from .ast_set_int import ASTSetInt
 from .ast_set_var import ASTSetVar
-from .code_buffer import CodeBuffer
 from .code_getters import IGetter
 from .code_stack import Stack
 from .code_var import CodeVar
+from .goto import Goto
+from .ibuffer import Lowering
 from .iprocessable import IProcessable
 
 
 class ASTCase(IProcessable):
+    """Dispatch as one ladder of nested loops, each entered only if the value differs from the next label.
+
+    The matching level leaves the copy at zero, so every loop around it exits at once and only its branch sees the
+    flag still set.
+    """
+
     def __init__(self, test_var: IGetter, code: List[Tuple[int, List[IProcessable]]]):
         self.test_var: IGetter = test_var
         self.code: List[Tuple[int, List[IProcessable]]] = code
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
-        if len(self.code) != 0:
-            copy_var = stack.push()
-            out.write(ASTSetVar([copy_var], self.test_var))
-            last = 0
-            for i in self.code:
-                out.write(ASTIsubInt([copy_var], i[0] - last))
-                out.write(ASTIfElif([(copy_var, [])], code_else=i[1]))
-                last = i[0]
-
-            stack.pop(copy_var)
+    def __str__(self):
+        return f"case({self.test_var})"
+
+    def labels(self) -> List[Tuple[int, List[IProcessable]]]:
+        data: Dict[int, List[IProcessable]] = {}
+        for num, code in self.code:
+            data.setdefault(num % 256, []).extend(code)
+        return sorted(data.items(), key=lambda i: i[0])
+
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        labels = self.labels()
+        if len(labels) == 0:
+            return
+
+        copy_var = stack.push()
+        flag = stack.push()
+        yield ASTSetVar([copy_var], self.test_var)
+        yield ASTSetInt([flag], 1)
+        last = 0
+        for num, _ in labels:
+            yield ASTIsubInt([copy_var], num - last)
+            yield Goto(copy_var)
+            yield "["
+            last = num
+        # no label matched
+        yield Goto(copy_var)
+        yield "[-]"
+        yield Goto(flag)
+        yield "-"
+
+        for _, code in reversed(labels):
+            yield Goto(copy_var)
+            yield "]"
+            yield Goto(flag)
+            yield "[-"
+            for i in code:
+                yield i
+            yield Goto(flag)
+            yield "]"
+        stack.pop(flag)
+        stack.pop(copy_var)
@@ -0,0 +1,105 @@
+from typing import List, Dict, Optional, Union
+
+from .ast_if_elif import ASTIfElif
+from .ast_set_int import ASTSetInt
+from .ast_set_var import ASTSetVar
+from .code_getters import IGetter, IndexGetter
+from .code_stack import Stack
+from .code_var import CodeVar
+from .goto import Goto
+from .ibuffer import Lowering
+from .iprocessable import IProcessable
+from .util import bf_add, wrap
+
+# n d r+1 q 0 0 -> 0 d-n%d n%d+1 n/d 0 0
+DIVMOD_KERNEL = "[->-[>+>>]>[[-<+>]+>+>>]<<<<<]"
+# n d 1 0 0 0 -> 0 d-n%d 1 0 0 n/d, the counter is reloaded with the constant instead of being restored
+DIVMOD_INT_KERNEL = "[->-[>>]>[<{}>>>>+<]<<<<]"
+DIVMOD_SIZE = 6
+
+
+class ASTDivmod(IProcessable):
+    """Quotient and remainder in one pass over the dividend, with division by zero giving 255 for both."""
+
+    def __init__(self, quotient: Optional[IGetter], remainder: Optional[IGetter], left: IGetter,
+                 right: Union[IGetter, int]):
+        self.quotient: Optional[IGetter] = quotient
+        self.remainder: Optional[IGetter] = remainder
+        self.left: IGetter = left
+        self.right: Union[IGetter, int] = right
+
+    def __str__(self):
+        return f"{self.quotient}, {self.remainder} = {self.left} divmod {self.right}"
+
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        if isinstance(self.right, int):
+            yield from self.process_int(stack, self.right % 256)
+        else:
+            yield from self.process_var(stack)
+
+    def process_var(self, stack: Stack) -> Lowering:
+        scratch = stack.scratch(DIVMOD_SIZE)
+        cells: List[IGetter] = [IndexGetter(scratch, i) for i in range(DIVMOD_SIZE)]
+        yield ASTSetVar([cells[0]], self.left)
+        yield ASTSetVar([cells[1]], self.right)
+        # skip the kernel, the remainder cell wraps to 0 and back to 255
+        yield ASTIfElif([(cells[1], [])], code_else=[
+            ASTSetInt([cells[0]], 0),
+            ASTSetInt([cells[2], cells[3]], 255),
+        ])
+        yield Goto(cells[2])
+        yield "+"
+        yield Goto(cells[0])
+        yield DIVMOD_KERNEL
+
+        yield Goto(cells[1])
+        yield "[-]"
+        yield Goto(cells[2])
+        yield "-"
+        yield from self.move(self.quotient, cells[3])
+        yield from self.move(self.remainder, cells[2])
+
+    def process_int(self, stack: Stack, num: int) -> Lowering:
+        if num == 0:
+            yield ASTSetInt([i for i in (self.quotient, self.remainder) if i is not None], 255)
+            return
+
+        scratch = stack.scratch(DIVMOD_SIZE)
+        cells: List[IGetter] = [IndexGetter(scratch, i) for i in range(DIVMOD_SIZE)]
+        yield ASTSetVar([cells[0]], self.left)
+        yield Goto(cells[1])
+        yield bf_add(wrap(num))
+        yield Goto(cells[2])
+        yield "+"
+        yield Goto(cells[0])
+        yield DIVMOD_INT_KERNEL.format(bf_add(wrap(num)))
+
+        yield Goto(cells[2])
+        yield "-"
+        yield from self.move(self.quotient, cells[5])
+        if self.remainder is None:
+            yield Goto(cells[1])
+            yield "[-]"
+            return
+        # the counter ran down from num by the remainder
+        yield ASTSetInt([self.remainder], num)
+        yield Goto(cells[1])
+        yield "[-"
+        yield Goto(self.remainder)
+        yield "-"
+        yield Goto(cells[1])
+        yield "]"
+
+    @staticmethod
+    def move(result: Optional[IGetter], cell: IGetter) -> Lowering:
+        if result is None:
+            yield Goto(cell)
+            yield "[-]"
+            return
+        yield ASTSetInt([result], 0)
+        yield Goto(cell)
+        yield "[-"
+        yield Goto(result)
+        yield "+"
+        yield Goto(cell)
+        yield "]"
@@ -1,12 +1,12 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
-from .code_buffer import CodeBuffer
-from .code_getters import IGetter
+from .code_getters import IGetter, IndexGetter, VarGetter
 from .code_stack import Stack
 from .code_var import CodeVar
 from .goto import Goto
+from .ibuffer import Lowering
 from .iprocessable import IProcessable
-from .util import bf_add
+from .util import bf_add, bf_const, wrap
 
 
 class ASTIaddInt(IProcessable):
@@ -17,7 +17,48 @@ class ASTIaddInt(IProcessable):
     def __str__(self):
         return f"{str(self.names)[1:-1]} += {self.num}"
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
+    def trip(self, declarations: Dict[str, CodeVar], stack: Stack) -> Optional[int]:
+        """Cells the pointer moves from the next stack temporary over the targets and back, None if not known yet."""
+        if stack.packed:
+            return None
+        temp = declarations[stack.name].pos + stack.current
+        cells = [temp] + [self.cell(i, declarations, stack) for i in self.names] + [temp]
+        return sum(abs(f - i) for i, f in zip(cells, cells[1:]))
+
+    @staticmethod
+    def cell(getter: IGetter, declarations: Dict[str, CodeVar], stack: Stack) -> int:
+        # the scratch is declared after lowering, in front of the stack
+        if isinstance(getter, IndexGetter) and isinstance(getter.getter, VarGetter) and \
+                getter.getter.name not in declarations.keys():
+            return declarations[stack.name].pos + getter.index
+        return getter.get_var(declarations).pos
+
+    def const(self, declarations: Dict[str, CodeVar], stack: Stack) -> Optional[Tuple[int, int, int]]:
+        return bf_const(self.num % 256, len(self.names), self.trip(declarations, stack))
+
+    def guard(self, declarations: Dict[str, CodeVar], stack: Stack) -> Optional[tuple]:
+        if stack.packed:
+            return None
+        return self.const(declarations, stack),
+
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        const = self.const(declarations, stack)
+        if const is None:
+            for i in self.names:
+                yield Goto(i)
+                yield bf_add(wrap(self.num))
+            return
+
+        loops, step, rest = const
+        copy_var = stack.push()
+        yield Goto(copy_var)
+        yield "[-]" + bf_add(loops) + "[-"
+        for i in self.names:
+            yield Goto(i)
+            yield bf_add(step)
+        yield Goto(copy_var)
+        yield "]"
         for i in self.names:
-            out.write(Goto(i))
-            out.write(bf_add(self.num))
+            yield Goto(i)
+            yield bf_add(rest)
+        stack.pop(copy_var)
@@ -1,15 +1,10 @@
 from typing import List, Dict
 
-from .ast_iadd_int import ASTIaddInt
-from .ast_if_elif import ASTIfElif
-from .ast_isub_int import ASTIsubInt
-from .ast_set_int import ASTSetInt
-from .ast_set_var import ASTSetVar
-from .base_ast import ASTWhile
-from .code_buffer import CodeBuffer
+from .ast_divmod import ASTDivmod
 from .code_getters import IGetter
 from .code_stack import Stack
 from .code_var import CodeVar
+from .ibuffer import Lowering
 from .iprocessable import IProcessable
 
 
@@ -18,33 +13,9 @@ class ASTIdivInt(IProcessable):
         self.names: List[IGetter] = names
         self.num: int = num
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
-        for left in self.names:
-            if self.num == 0:
-                out.write(ASTSetInt([left], -1))
-                continue
-            work = stack.push()
-            out.write(ASTSetInt([work], 1))
-            counter = stack.push()
-            out.write(ASTSetInt([counter], 0))
-            left_var = stack.push()
-            out.write(ASTSetVar([left_var], left))
-            right_var = stack.push()
+    def __str__(self):
+        return f"{str(self.names)[1:-1]} /= {self.num}"
 
-            out.write(ASTWhile(work, [
-                ASTSetInt([right_var], self.num),
-                ASTWhile(right_var, [
-                    ASTIfElif([(left_var, [])], code_else=[
-                        ASTSetInt([work], 0),
-                        ASTSetInt([left_var, right_var], 1),
-                    ]),
-                    ASTIsubInt([left_var, right_var], 1),
-                ]),
-                ASTIaddInt([counter], 1),
-            ]))
-            out.write(ASTIsubInt([counter], 1))
-            out.write(ASTSetVar([left], counter))
-            stack.pop(right_var)
-            stack.pop(left_var)
-            stack.pop(counter)
-            stack.pop(work)
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        for left in self.names:
+            yield ASTDivmod(left, None, left, self.num)
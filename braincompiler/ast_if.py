@@ -1,25 +1,53 @@
 from typing import List, Dict
 
-from .ast_set_int import ASTSetInt
-from .ast_set_var import ASTSetVar
-from .base_ast import ASTWhile
-from .code_buffer import CodeBuffer
 from .code_getters import IGetter
 from .code_stack import Stack
 from .code_var import CodeVar
+from .goto import Goto
+from .ibuffer import Lowering
 from .iprocessable import IProcessable
 
 
 class ASTIf(IProcessable):
-    def __init__(self, test_var: IGetter, code: List[IProcessable]):
+    def __init__(self, test_var: IGetter, code: List[IProcessable], consume: bool = False):
         self.test_var: IGetter = test_var
         self.code: List[IProcessable] = code
+        # the test var is not read afterwards and is cleared by the test
+        self.consume: bool = consume
 
     def __str__(self):
         return f"if({self.test_var})"
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        if self.consume:
+            yield Goto(self.test_var)
+            yield "["
+            for i in self.code:
+                yield i
+            yield Goto(self.test_var)
+            yield "[-]]"
+            return
+
+        # move the value out and back in as the first thing the body does, leaving the loop cell empty
         copy_var = stack.push()
-        out.write(ASTSetVar([copy_var], self.test_var))
-        out.write(ASTWhile(copy_var, self.code + [ASTSetInt([copy_var], 0)]))
+        yield Goto(copy_var)
+        yield "[-]"
+        yield Goto(self.test_var)
+        yield "[-"
+        yield Goto(copy_var)
+        yield "+"
+        yield Goto(self.test_var)
+        yield "]"
+        yield Goto(copy_var)
+        yield "["
+        yield Goto(copy_var)
+        yield "[-"
+        yield Goto(self.test_var)
+        yield "+"
+        yield Goto(copy_var)
+        yield "]"
+        for i in self.code:
+            yield i
+        yield Goto(copy_var)
+        yield "]"
         stack.pop(copy_var)
@@ -1,33 +1,48 @@
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Set
 
 from .ast_if import ASTIf
-from .ast_set_int import ASTSetInt
-from .code_buffer import CodeBuffer
+from .ast_isub_int import ASTIsubInt
 from .code_getters import IGetter
 from .code_stack import Stack
 from .code_var import CodeVar
+from .goto import Goto
+from .ibuffer import Lowering
 from .iprocessable import IProcessable
 
 
 class ASTIfElif(IProcessable):
-    def __init__(self, data: List[Tuple[IGetter, List[IProcessable]]], code_else: List[IProcessable] = None):
+    def __init__(self, data: List[Tuple[IGetter, List[IProcessable]]], code_else: List[IProcessable] = None,
+                 consume: Set[int] = None):
         self.data: List[Tuple[IGetter, List[IProcessable]]] = data
         self.code_else: List[IProcessable] = code_else
+        # indexes of the tests whose var is not read after the statement
+        self.consume: Set[int] = set() if consume is None else consume
 
     def __str__(self):
         return f"if({self.data[0][0]})" + \
                "".join(f"elif({i[0]})" for i in self.data) + \
                f"else" if self.code_else is not None else ""
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        test_var, code = self.data[0]
+        if len(self.data) != 1:
+            # the remaining tests nest in the else branch
+            code_else = [ASTIfElif(self.data[1:], self.code_else, {i - 1 for i in self.consume if i != 0})]
+        else:
+            code_else = self.code_else
+        if code_else is None:
+            yield ASTIf(test_var, code, 0 in self.consume)
+            return
+
         else_flag = stack.push()
-        out.write(ASTSetInt([else_flag], 1))
-        out.write(ASTIf(self.data[0][0], self.data[0][1] + [ASTSetInt([else_flag], 0)]))
-        for i in self.data[1:]:
-            out.write(ASTIf(
-                else_flag,
-                [ASTIf(i[0], i[1] + [ASTSetInt([else_flag], 0)])]
-            ))
-        if self.code_else is not None:
-            out.write(ASTIf(else_flag, self.code_else))
+        yield Goto(else_flag)
+        yield "[-]+"
+        yield ASTIf(test_var, [ASTIsubInt([else_flag], 1)] + code, 0 in self.consume)
+        yield Goto(else_flag)
+        yield "[-"
+        for i in code_else:
+            yield i
+        yield Goto(else_flag)
+        yield "]"
         stack.pop(else_flag)
+
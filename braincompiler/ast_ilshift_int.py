@@ -1,10 +1,10 @@
 from typing import List, Dict
 
 from .ast_imul_int import ASTImulInt
-from .code_buffer import CodeBuffer
 from .code_getters import IGetter
 from .code_stack import Stack
 from .code_var import CodeVar
+from .ibuffer import Lowering
 from .iprocessable import IProcessable
 
 
@@ -13,7 +13,7 @@ class ASTIlshiftInt(IProcessable):
         self.names: List[IGetter] = names
         self.num: int = num
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
         if self.num == 0:
             return
-        out.write(ASTImulInt(self.names, 2 ** self.num))
+        yield ASTImulInt(self.names, 2 ** self.num)
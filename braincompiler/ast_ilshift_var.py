@@ -1,13 +1,11 @@
 from typing import List, Dict
 
-from .ast_ilshift_int import ASTIlshiftInt
-from .ast_isub_int import ASTIsubInt
 from .ast_set_var import ASTSetVar
-from .base_ast import ASTWhile
-from .code_buffer import CodeBuffer
 from .code_getters import IGetter
 from .code_stack import Stack
 from .code_var import CodeVar
+from .goto import Goto
+from .ibuffer import Lowering
 from .iprocessable import IProcessable
 
 
@@ -16,11 +14,52 @@ class ASTIlshiftVar(IProcessable):
         self.names: List[IGetter] = names
         self.right: IGetter = right
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
-        copy_var = stack.push()
-        out.write(ASTSetVar([copy_var], self.right))
-        out.write(ASTWhile(copy_var, [
-            ASTIsubInt([copy_var], 1),
-            ASTIlshiftInt(self.names, 1),
-        ]))
-        stack.pop(copy_var)
+    def __str__(self):
+        return f"{str(self.names)[1:-1]} <<= {self.right}"
+
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        # the count is read once, it may be one of the targets
+        count = stack.push()
+        yield ASTSetVar([count], self.right)
+        for left in self.names:
+            counter = stack.push()
+            copy_var = stack.push()
+            zero_flag = stack.push()
+            yield ASTSetVar([counter], count)
+            yield Goto(copy_var)
+            yield "[-]"
+            yield Goto(zero_flag)
+            yield "[-]"
+
+            yield Goto(counter)
+            yield "[-"
+            yield Goto(zero_flag)
+            yield "+"
+            yield Goto(left)
+            yield "[-"
+            yield Goto(copy_var)
+            yield "++"
+            yield Goto(left)
+            yield "]"
+            yield Goto(copy_var)
+            yield "[-"
+            yield Goto(left)
+            yield "+"
+            yield Goto(zero_flag)
+            yield "[-]"
+            yield Goto(copy_var)
+            yield "]"
+            # stop once the value is zero, at the latest after 8 doublings
+            yield Goto(zero_flag)
+            yield "[-"
+            yield Goto(counter)
+            yield "[-]"
+            yield Goto(zero_flag)
+            yield "]"
+            yield Goto(counter)
+            yield "]"
+
+            stack.pop(zero_flag)
+            stack.pop(copy_var)
+            stack.pop(counter)
+        stack.pop(count)
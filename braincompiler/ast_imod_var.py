@@ -1,16 +1,10 @@
 from typing import List, Dict
 
-from .ast_if import ASTIf
-from .ast_if_elif import ASTIfElif
-from .ast_isub_int import ASTIsubInt
-from .ast_isub_var import ASTIsubVar
-from .ast_set_int import ASTSetInt
-from .ast_set_var import ASTSetVar
-from .base_ast import ASTWhile
-from .code_buffer import CodeBuffer
+from .ast_divmod import ASTDivmod
 from .code_getters import IGetter
 from .code_stack import Stack
 from .code_var import CodeVar
+from .ibuffer import Lowering
 from .iprocessable import IProcessable
 
 
@@ -19,31 +13,9 @@ class ASTImodVar(IProcessable):
         self.names: List[IGetter] = names
         self.right: IGetter = right
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
-        for left in self.names:
-            work = stack.push()
-            out.write(ASTSetInt([work], 1))
-            left_var = stack.push()
-            out.write(ASTSetVar([left_var], left))
-            right_var = stack.push()
+    def __str__(self):
+        return f"{str(self.names)[1:-1]} %= {self.right}"
 
-            out.write(ASTIf(self.right, [
-                ASTWhile(work, [
-                    ASTSetVar([right_var], self.right),
-                    ASTWhile(right_var, [
-                        ASTIfElif([(left_var, [])], code_else=[
-                            ASTSetInt([work], 0),
-                            ASTSetVar([left], self.right),
-                            ASTIsubVar([left], right_var),
-                            ASTSetInt([left_var, right_var], 1),
-                        ]),
-                        ASTIsubInt([left_var, right_var], 1),
-                    ]),
-                ])
-            ]))
-            out.write(ASTIfElif([(self.right, [])], code_else=[
-                ASTSetInt([left], 255),
-            ]))
-            stack.pop(right_var)
-            stack.pop(left_var)
-            stack.pop(work)
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        for left in self.names:
+            yield ASTDivmod(None, left, left, self.right)
@@ -1,14 +1,14 @@
 from typing import List, Dict
 
-from .ast_iadd_var import ASTIaddVar
-from .ast_imul_var import ASTImulVar
+from .ast_iadd_int import ASTIaddInt
 from .ast_set_int import ASTSetInt
-from .ast_set_var import ASTSetVar
-from .code_buffer import CodeBuffer
 from .code_getters import IGetter
 from .code_stack import Stack
 from .code_var import CodeVar
+from .goto import Goto
+from .ibuffer import Lowering
 from .iprocessable import IProcessable
+from .util import wrap
 
 
 class ASTImulInt(IProcessable):
@@ -16,21 +16,32 @@ class ASTImulInt(IProcessable):
         self.names: List[IGetter] = names
         self.num: int = num
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
-        if self.num == 0:
-            out.write(ASTSetInt(self.names, 0))
-            return
+    def __str__(self):
+        return f"{str(self.names)[1:-1]} *= {self.num}"
 
-        if abs(self.num) >= 16:
-            copy_var = stack.push()
-            out.write(ASTSetInt([copy_var], self.num))
-            out.write(ASTImulVar(self.names, copy_var))
-            stack.pop(copy_var)
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        num = wrap(self.num)
+        if num == 0:
+            yield ASTSetInt(self.names, 0)
+            return
+        if num == 1:
             return
 
         for left in self.names:
-            copy_var = stack.push()
-            out.write(ASTSetVar([copy_var], left))
-            for _ in range(self.num - 1):
-                out.write(ASTIaddVar([left], copy_var))
-            stack.pop(copy_var)
+            counter = stack.push()
+            yield Goto(counter)
+            yield "[-]"
+            yield Goto(left)
+            yield "[-"
+            yield Goto(counter)
+            yield "+"
+            yield Goto(left)
+            yield "]"
+
+            # a single transfer loop, large factors are split by the constant generator
+            yield Goto(counter)
+            yield "[-"
+            yield ASTIaddInt([left], num)
+            yield Goto(counter)
+            yield "]"
+            stack.pop(counter)
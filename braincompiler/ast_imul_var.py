@@ -1,14 +1,10 @@
 from typing import List, Dict
 
-from .ast_iadd_var import ASTIaddVar
-from .ast_isub_int import ASTIsubInt
-from .ast_set_int import ASTSetInt
-from .ast_set_var import ASTSetVar
-from .base_ast import ASTWhile
-from .code_buffer import CodeBuffer
 from .code_getters import IGetter
 from .code_stack import Stack
 from .code_var import CodeVar
+from .goto import Goto
+from .ibuffer import Lowering
 from .iprocessable import IProcessable
 
 
@@ -17,16 +13,57 @@ class ASTImulVar(IProcessable):
         self.names: List[IGetter] = names
         self.right: IGetter = right
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
+    def __str__(self):
+        return f"{str(self.names)[1:-1]} *= {self.right}"
+
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
         for left in self.names:
+            counter = stack.push()
             copy_var = stack.push()
-            copy_var2 = stack.push()
-            out.write(ASTSetVar([copy_var], left))
-            out.write(ASTSetVar([copy_var2], self.right))
-            out.write(ASTSetInt([left], 0))
-            out.write(ASTWhile(copy_var2, [
-                ASTIsubInt([copy_var2], 1),
-                ASTIaddVar([left], copy_var),
-            ]))
-            stack.pop(copy_var2)
+            right = self.right
+            if left == right:
+                right = stack.push()
+                yield Goto(right)
+                yield "[-]"
+            yield Goto(counter)
+            yield "[-]"
+            yield Goto(copy_var)
+            yield "[-]"
+
+            # move left into the loop counter
+            yield Goto(left)
+            yield "[-"
+            yield Goto(counter)
+            yield "+"
+            if right != self.right:
+                yield Goto(right)
+                yield "+"
+            yield Goto(left)
+            yield "]"
+
+            # add right to left once per unit of the counter, restoring right after each pass
+            yield Goto(counter)
+            yield "[-"
+            yield Goto(right)
+            yield "[-"
+            yield Goto(left)
+            yield "+"
+            yield Goto(copy_var)
+            yield "+"
+            yield Goto(right)
+            yield "]"
+            yield Goto(copy_var)
+            yield "[-"
+            yield Goto(right)
+            yield "+"
+            yield Goto(copy_var)
+            yield "]"
+            yield Goto(counter)
+            yield "]"
+
+            if right != self.right:
+                yield Goto(right)
+                yield "[-]"
+                stack.pop(right)
             stack.pop(copy_var)
+            stack.pop(counter)
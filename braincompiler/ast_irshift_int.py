@@ -1,10 +1,11 @@
 from typing import List, Dict
 
 from .ast_idiv_int import ASTIdivInt
-from .code_buffer import CodeBuffer
+from .ast_set_int import ASTSetInt
 from .code_getters import IGetter
 from .code_stack import Stack
 from .code_var import CodeVar
+from .ibuffer import Lowering
 from .iprocessable import IProcessable
 
 
@@ -13,7 +14,10 @@ class ASTIrshiftInt(IProcessable):
         self.names: List[IGetter] = names
         self.num: int = num
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
         if self.num == 0:
             return
-        out.write(ASTIdivInt(self.names, 2 ** self.num))
+        if self.num >= 8:
+            yield ASTSetInt(self.names, 0)
+            return
+        yield ASTIdivInt(self.names, 2 ** self.num)
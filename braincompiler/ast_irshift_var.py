@@ -1,13 +1,13 @@
 from typing import List, Dict
 
-from .ast_irshift_int import ASTIrshiftInt
-from .ast_isub_int import ASTIsubInt
-from .ast_set_var import ASTSetVar
-from .base_ast import ASTWhile
-from .code_buffer import CodeBuffer
+from .ast_divmod import ASTDivmod
+from .ast_if_elif import ASTIfElif
+from .ast_ilshift_var import ASTIlshiftVar
+from .ast_set_int import ASTSetInt
 from .code_getters import IGetter
 from .code_stack import Stack
 from .code_var import CodeVar
+from .ibuffer import Lowering
 from .iprocessable import IProcessable
 
 
@@ -16,11 +16,16 @@ class ASTIrshiftVar(IProcessable):
         self.names: List[IGetter] = names
         self.right: IGetter = right
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
-        copy_var = stack.push()
-        out.write(ASTSetVar([copy_var], self.right))
-        out.write(ASTWhile(copy_var, [
-            ASTIsubInt([copy_var], 1),
-            ASTIrshiftInt(self.names, 1),
-        ]))
-        stack.pop(copy_var)
+    def __str__(self):
+        return f"{str(self.names)[1:-1]} >>= {self.right}"
+
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        # a single division by 2 ** right instead of halving once per bit, shifting by 8 or more wraps it to 0
+        divisor = stack.push()
+        yield ASTSetInt([divisor], 1)
+        yield ASTIlshiftVar([divisor], self.right)
+        for n, left in enumerate(self.names):
+            yield ASTIfElif([(divisor, [ASTDivmod(left, None, left, divisor)])], code_else=[
+                ASTSetInt([left], 0),
+            ], consume={0} if n == len(self.names) - 1 else None)
+        stack.pop(divisor)
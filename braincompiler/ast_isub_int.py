@@ -1,12 +1,11 @@
 from typing import List, Dict
 
-from .code_buffer import CodeBuffer
+from .ast_iadd_int import ASTIaddInt
 from .code_getters import IGetter
 from .code_stack import Stack
 from .code_var import CodeVar
-from .goto import Goto
+from .ibuffer import Lowering
 from .iprocessable import IProcessable
-from .util import bf_add
 
 
 class ASTIsubInt(IProcessable):
@@ -17,7 +16,5 @@ class ASTIsubInt(IProcessable):
     def __str__(self):
         return f"{str(self.names)[1:-1]} -= {self.num}"
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
-        for i in self.names:
-            out.write(Goto(i))
-            out.write(bf_add(-self.num))
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        yield ASTIaddInt(self.names, -self.num)
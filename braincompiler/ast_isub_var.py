@@ -4,10 +4,10 @@ from .ast_iadd_int import ASTIaddInt
 from .ast_isub_int import ASTIsubInt
 from .ast_set_int import ASTSetInt
 from .base_ast import ASTWhile
-from .code_buffer import CodeBuffer
 from .code_getters import IGetter
 from .code_stack import Stack
 from .code_var import CodeVar
+from .ibuffer import Lowering
 from .iprocessable import IProcessable
 
 
@@ -19,21 +19,19 @@ class ASTIsubVar(IProcessable):
     def __str__(self):
         return f"{str(self.names)[1:-1]} -= {self.right}"
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
         copy_var = stack.push()
-        out.write(ASTSetInt([copy_var], 0))
-
-        out.write(
-            ASTWhile(self.right, [
-                ASTIsubInt([self.right], 1),
-                ASTIsubInt(self.names, 1),
-                ASTIaddInt([copy_var], 1)
-            ]))
-
-        out.write(
-            ASTWhile(copy_var, [
-                ASTIsubInt([copy_var], 1),
-                ASTIaddInt([self.right], 1)
-            ]))
+        yield ASTSetInt([copy_var], 0)
+
+        yield ASTWhile(self.right, [
+            ASTIsubInt([self.right], 1),
+            ASTIsubInt(self.names, 1),
+            ASTIaddInt([copy_var], 1)
+        ])
+
+        yield ASTWhile(copy_var, [
+            ASTIsubInt([copy_var], 1),
+            ASTIaddInt([self.right], 1)
+        ])
 
         stack.pop(copy_var)
@@ -1,12 +1,10 @@
 from typing import Dict, List
 
-from .ast_case import ASTCase
-from .ast_set_var import ASTSetVar
-from .code_buffer import CodeBuffer
-from .code_getters import IGetter, IndexGetter
+from .ast_list_walk import ASTListWalk
+from .code_getters import IGetter
 from .code_stack import Stack
-from .code_types import StringCodeType
 from .code_var import CodeVar
+from .ibuffer import Lowering
 from .iprocessable import IProcessable
 
 
@@ -16,11 +14,8 @@ class ASTListGetVar(IProcessable):
         self.right: IGetter = right
         self.index: IGetter = index
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
-        var: CodeVar = self.right.get_var(declarations)
-        assert isinstance(var.type, StringCodeType)
-        out.write(
-            ASTCase(self.index, [
-                (i, [ASTSetVar(self.names, IndexGetter(self.right, i))])
-                for i in range(var.type.len_)
-            ]))
+    def __str__(self):
+        return f"{str(self.names)[1:-1]} = {self.right}[{self.index}]"
+
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        yield ASTListWalk(self.right, self.index, self.names)
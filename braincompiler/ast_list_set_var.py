@@ -1,12 +1,10 @@
 from typing import Dict
 
-from .ast_case import ASTCase
-from .ast_set_var import ASTSetVar
-from .code_buffer import CodeBuffer
-from .code_getters import IGetter, IndexGetter
+from .ast_list_walk import ASTListWalk
+from .code_getters import IGetter
 from .code_stack import Stack
-from .code_types import StringCodeType
 from .code_var import CodeVar
+from .ibuffer import Lowering
 from .iprocessable import IProcessable
 
 
@@ -16,11 +14,8 @@ class ASTListSetVar(IProcessable):
         self.index: IGetter = index
         self.right: IGetter = right
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
-        var: CodeVar = self.name.get_var(declarations)
-        assert isinstance(var.type, StringCodeType)
-        a = ASTCase(self.index, [
-            (i, [ASTSetVar([IndexGetter(self.name, i)], self.right)])
-            for i in range(var.type.len_)
-        ])
-        out.write(a)
+    def __str__(self):
+        return f"{self.name}[{self.index}] = {self.right}"
+
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        yield ASTListWalk(self.name, self.index, [], self.right)
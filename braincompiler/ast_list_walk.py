@@ -0,0 +1,82 @@
+from typing import List, Dict, Optional
+
+from .ast_case import ASTCase
+from .ast_divmod import ASTDivmod
+from .ast_if_elif import ASTIfElif
+from .ast_isub_var import ASTIsubVar
+from .ast_set_int import ASTSetInt
+from .ast_set_var import ASTSetVar
+from .code_getters import IGetter, IndexGetter, CellGetter
+from .code_stack import Stack
+from .code_types import StringCodeType
+from .code_var import CodeVar
+from .goto import Goto
+from .ibuffer import Lowering
+from .iprocessable import IProcessable
+
+# frame of the tail: steps left, steps taken, value, free cell for the item passing through
+LIST_TAIL = 4
+# moves the frame left by one item per step, the item goes to the right of the frame
+LIST_WALK_OUT = "[->+<<[->>>>+<<<<]>[-<+>]>[-<+>]>[-<+>]<<<]"
+# moves the frame back to the tail, restoring the items
+LIST_WALK_BACK = ">[->>>[-<<<<+>>>>]<<[->+<]<[->+<]>]<"
+LIST_GET = "<[->+>>+<<<]>[-<+>]"
+LIST_SET = "<[-]>>>[-<<<+>>>]<<"
+
+
+class ASTListWalk(IProcessable):
+    """Dynamic indexing by carrying the index and the value through the string and back.
+
+    The code size is constant and the runtime is linear in the length of the string. Indexes out of the string do
+    nothing. Strings without the tail or too long for a one cell counter are indexed by a case over every item.
+    """
+
+    def __init__(self, name: IGetter, index: IGetter, names: List[IGetter], right: Optional[IGetter] = None):
+        self.name: IGetter = name
+        self.index: IGetter = index
+        self.names: List[IGetter] = names
+        self.right: Optional[IGetter] = right
+
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        var: CodeVar = self.name.get_var(declarations)
+        assert isinstance(var.type, StringCodeType)
+        if var.type.tail < LIST_TAIL or var.type.len_ > 256:
+            # a one cell index reaches only the first 256 items
+            yield ASTCase(self.index, [
+                (i, [self.access(IndexGetter(self.name, i))]) for i in range(min(var.type.len_, 256))
+            ])
+            return
+        if var.type.len_ == 256:
+            yield from self.walk(var)
+            return
+
+        # the quotient is zero only for the indexes of the items
+        quotient = stack.push()
+        yield ASTDivmod(quotient, None, self.index, var.type.len_)
+        yield ASTIfElif([(quotient, [])], list(self.walk(var)), {0})
+        stack.pop(quotient)
+
+    def access(self, item: IGetter) -> IProcessable:
+        if self.right is None:
+            return ASTSetVar(self.names, item)
+        return ASTSetVar([item], self.right)
+
+    def walk(self, var: CodeVar) -> Lowering:
+        steps, _, value, _ = [CellGetter(self.name, var.type.len_ + i) for i in range(LIST_TAIL)]
+        yield ASTSetInt([steps], var.type.len_ - 1)
+        yield ASTIsubVar([steps], self.index)
+        if self.right is not None:
+            yield ASTSetVar([value], self.right)
+        yield Goto(steps)
+        yield LIST_WALK_OUT + (LIST_GET if self.right is None else LIST_SET) + LIST_WALK_BACK
+
+        if len(self.names) == 0:
+            return
+        yield ASTSetInt(self.names, 0)
+        yield Goto(value)
+        yield "[-"
+        for i in self.names:
+            yield Goto(i)
+            yield "+"
+        yield Goto(value)
+        yield "]"
@@ -1,11 +1,11 @@
 from typing import List, Dict
 
 from .ast_iadd_int import ASTIaddInt
-from .code_buffer import CodeBuffer
 from .code_getters import IGetter
 from .code_stack import Stack
 from .code_var import CodeVar
 from .goto import Goto
+from .ibuffer import Lowering
 from .iprocessable import IProcessable
 
 
@@ -17,8 +17,13 @@ class ASTSetInt(IProcessable):
     def __str__(self):
         return f"{str(self.names)[1:-1]} = {self.num}"
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        # the addition is shared by the targets, a repeated target must get it once
+        names: List[IGetter] = []
         for i in self.names:
-            out.write(Goto(i))
-            out.write("[-]")
-            out.write(ASTIaddInt([i], self.num))
+            if i not in names:
+                names.append(i)
+        for i in names:
+            yield Goto(i)
+            yield "[-]"
+        yield ASTIaddInt(names, self.num)
@@ -1,57 +1,65 @@
 from typing import Dict, List
 
-from .code_buffer import CodeBuffer
 from .code_getters import IGetter
 from .code_stack import Stack
 from .code_var import CodeVar
 from .goto import Goto
+from .ibuffer import Lowering
 from .iprocessable import IProcessable
 
 
 class ASTAssembler(IProcessable):
+    memoize = False
+
     def __init__(self, code: str):
         self.code: str = code
 
     def __str__(self):
         return f"asm({repr(self.code)})"
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
-        out.write(self.code)
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        yield self.code
 
 
 class ASTGoto(IProcessable):
+    memoize = False
+
     def __init__(self, name: IGetter):
         self.name: IGetter = name
 
     def __str__(self):
         return f"goto {self.name}"
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
-        out.write(Goto(self.name))
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        yield Goto(self.name)
 
 
 class ASTOut(IProcessable):
+    memoize = False
+
     def __init__(self, name: IGetter):
         self.name: IGetter = name
 
     def __str__(self):
         return f"out {self.name}"
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
-        out.write(Goto(self.name))
-        out.write(".")
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        yield Goto(self.name)
+        yield "."
 
 
 class ASTIn(IProcessable):
+    memoize = False
+
     def __init__(self, name: IGetter):
         self.name: IGetter = name
 
     def __str__(self):
         return f"out {self.name}"
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
-        out.write(Goto(self.name))
-        out.write(",")
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        yield Goto(self.name)
+        yield ","
 
 
 class ASTWhile(IProcessable):
@@ -63,10 +71,10 @@ class ASTWhile(IProcessable):
     def __str__(self):
         return f"while({self.test_var})"
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
-        out.write(Goto(self.test_var))
-        out.write("[")
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        yield Goto(self.test_var)
+        yield "["
         for i in self.code:
-            out.write(i)
-        out.write(Goto(self.test_var))
-        out.write("]")
+            yield i
+        yield Goto(self.test_var)
+        yield "]"
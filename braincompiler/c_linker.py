@@ -0,0 +1,98 @@
+from typing import Iterator, List
+
+from .cell_ir import CellIR, Statement
+from .linker import CodeLinker
+
+
+class CLinker(CodeLinker):
+    """Lowers the code queue to C.
+
+    Every Goto is resolved at compile time, so cells are addressed directly by their position in a fixed tape instead
+    of walking a pointer. A runtime pointer only appears if asm code leaves a loop at another cell than it entered.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(CLinker, self).__init__(*args, **kwargs)
+        self.dynamic: bool = False
+        self.min_cell: int = 0
+        self.max_cell: int = 0
+
+    def parse(self) -> List[Statement]:
+        ir = CellIR(*self.queue())
+        code = ir.process()
+        self.dynamic = ir.dynamic
+        self.min_cell = ir.min_cell
+        self.max_cell = ir.max_cell
+        return code
+
+    def cell(self, k: int) -> str:
+        if self.dynamic:
+            return f"p[{k}]"
+        return f"m[{k - self.min_cell}]"
+
+    def generate(self, code: List[Statement], depth: int) -> Iterator[str]:
+        # [statements, next statement, depth], loop bodies are pushed instead of recursed into
+        frames: List[list] = [[code, 0, depth]]
+        while len(frames) != 0:
+            frame = frames[-1]
+            code, n, depth = frame
+            indent = "    " * depth
+            if n == len(code):
+                frames.pop()
+                if len(frames) != 0:
+                    yield f"{'    ' * (depth - 1)}}}\n"
+                continue
+            frame[1] = n + 1
+            i = code[n]
+            match i[0]:
+                case "add":
+                    yield f"{indent}{self.cell(i[1])} += {i[2]};\n"
+                case "set":
+                    yield f"{indent}{self.cell(i[1])} = {i[2]};\n"
+                case "mul":
+                    for k, num in i[2]:
+                        if num == 1:
+                            yield f"{indent}{self.cell(k)} += {self.cell(i[1])};\n"
+                        else:
+                            yield f"{indent}{self.cell(k)} += {self.cell(i[1])} * {num};\n"
+                    yield f"{indent}{self.cell(i[1])} = 0;\n"
+                case "out":
+                    yield f"{indent}putchar({self.cell(i[1])});\n"
+                case "in":
+                    yield f"{indent}{self.cell(i[1])} = read_cell();\n"
+                case "shift":
+                    yield f"{indent}p += {i[1]};\n"
+                case "loop":
+                    yield f"{indent}while ({self.cell(i[1])}) {{\n"
+                    frames.append([i[2], 0, depth + 1])
+
+    def header(self) -> Iterator[str]:
+        size = self.max_cell - self.min_cell + 1
+        if self.dynamic:
+            size = max(size, 30000) - self.min_cell
+        yield "#include <stdio.h>\n\n"
+        yield f"static unsigned char m[{size}];\n\n"
+        yield "static unsigned char read_cell(void) {\n"
+        yield "    int c = getchar();\n"
+        yield "    return c == EOF ? 0 : c;\n"
+        yield "}\n\n"
+        yield "int main(void) {\n"
+        if self.dynamic:
+            yield f"    unsigned char *p = m + {-self.min_cell};\n"
+
+    def link(self) -> Iterator[str]:
+        code = self.parse()
+        data: List[str] = list(self.header())
+        size = 0
+        for i in self.generate(code, 1):
+            data.append(i)
+            size += len(i)
+            if size >= self.chunk_size:
+                yield "".join(data)
+                data = []
+                size = 0
+        data.append("    return 0;\n}\n")
+        yield "".join(data)
+
+    def iter_chunks(self) -> Iterator[str]:
+        return self.link()
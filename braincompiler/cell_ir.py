@@ -0,0 +1,120 @@
+from typing import Dict, List, Union
+
+from .code_var import CodeVar
+from .goto import Goto
+
+# ("add", cell, num), ("set", cell, num), ("mul", cell, ((cell, num), ...)), ("out", cell), ("in", cell),
+# ("shift", num), ("loop", cell, [statement, ...])
+Statement = tuple
+
+
+class CellFrame:
+    def __init__(self, start: int):
+        self.start: int = start
+        self.code: List[Statement] = []
+        self.pending: Dict[int, List] = {}
+
+    def flush(self) -> None:
+        for k, (kind, num) in self.pending.items():
+            num %= 256
+            if kind == "add" and num == 0:
+                continue
+            self.code.append((kind, k, num))
+        self.pending.clear()
+
+    def reopen(self) -> None:
+        """Moves the trailing run of "add" and "set" statements back to pending, so later updates merge into it."""
+        n = len(self.code)
+        while n != 0 and self.code[n - 1][0] in ("add", "set"):
+            n -= 1
+        for kind, k, num in self.code[n:]:
+            self.pending[k] = [kind, num]
+        del self.code[n:]
+
+
+class CellIR:
+    """Structured IR of the code queue in which every instruction references an absolute cell.
+
+    Goto movements are resolved at build time, additions between loops and io are merged per cell, clear loops become
+    "set" and balanced transfer loops become "mul". Cells are relative to a runtime pointer that only moves by "shift",
+    which is emitted when asm code leaves a loop at another cell than it entered.
+    """
+
+    def __init__(self, code: List[Union[Goto, str]], declarations: Dict[str, CodeVar]):
+        self.code: List[Union[Goto, str]] = code
+        self.declarations: Dict[str, CodeVar] = declarations
+
+        self.dynamic: bool = False
+        self.min_cell: int = 0
+        self.max_cell: int = 0
+
+    def process(self) -> List[Statement]:
+        frames: List[CellFrame] = [CellFrame(0)]
+        k = 0
+        pos = 0
+        for i in self.code:
+            if isinstance(i, Goto):
+                var = i.var.get_var(self.declarations).pos
+                k += var - pos
+                pos = var
+                continue
+            if not isinstance(i, str):
+                raise Exception
+            n = 0
+            while n < len(i):
+                frame = frames[-1]
+                self.min_cell = min(self.min_cell, k)
+                self.max_cell = max(self.max_cell, k)
+                match i[n]:
+                    case ">":
+                        k += 1
+                    case "<":
+                        k -= 1
+                    case "+" | "-":
+                        frame.pending.setdefault(k, ["add", 0])[1] += 1 if i[n] == "+" else -1
+                    case "[" if i[n:n + 3] == "[-]":
+                        frame.pending[k] = ["set", 0]
+                        n += 2
+                    case "[":
+                        frame.flush()
+                        frames.append(CellFrame(k))
+                    case "]":
+                        if len(frames) == 1:
+                            raise Exception("Unbalanced ]")
+                        frames.pop()
+                        loop = self.loop(frame, k)
+                        if loop[0] == "set":
+                            # like [-], so later updates merge into it and into the ones flushed by [, a run never
+                            # holds two updates of a cell
+                            frames[-1].reopen()
+                            frames[-1].pending[frame.start] = ["set", 0]
+                        else:
+                            frames[-1].code.append(loop)
+                        k = frame.start
+                    case ".":
+                        frame.flush()
+                        frame.code.append(("out", k))
+                    case ",":
+                        frame.pending.pop(k, None)
+                        frame.flush()
+                        frame.code.append(("in", k))
+                n += 1
+        if len(frames) != 1:
+            raise Exception("Unbalanced [")
+        frames[0].flush()
+        return frames[0].code
+
+    def loop(self, frame: CellFrame, k: int) -> Statement:
+        start = frame.start
+        if k == start and len(frame.code) == 0 and all(i[0] == "add" for i in frame.pending.values()):
+            test = frame.pending.pop(start, ["add", 0])[1]
+            if test == -1:
+                return "mul", start, tuple((f, num % 256) for f, (_, num) in frame.pending.items() if num % 256 != 0)
+            if test % 2 == 1 and all(num % 256 == 0 for _, num in frame.pending.values()):
+                return "set", start, 0
+            frame.pending[start] = ["add", test]
+        frame.flush()
+        if k != start:
+            frame.code.append(("shift", k - start))
+            self.dynamic = True
+        return "loop", start, frame.code
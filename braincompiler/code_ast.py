@@ -1,26 +1,35 @@
 from collections import OrderedDict
 from itertools import chain
-from typing import List, Union, Tuple, Dict
+from typing import List, Union, Tuple, Dict, Optional
 
 from .code_buffer import CodeBuffer
-from .code_stack import Stack
+from .code_stack import Stack, SCRATCH_SUFFIX
+from .code_types import StringCodeType
 from .code_var import CodeVar
 from .goto import Goto
 from .ideclaration import IDeclaration
 from .iprocessable import IProcessable
+from .liveness import Liveness
+from .lowering_cache import LoweringCache
 
 
 class ASTFile:
     def __init__(self):
         self.declarations: Dict[str, IDeclaration] = OrderedDict()
         self.code: List[IProcessable] = []
+        # queue offsets at which a top level statement starts, and the end of the queue
+        self.boundaries: List[int] = []
+        # lowering cache of the last process, kept for its counters
+        self.cache: Optional[LoweringCache] = None
 
-    def process(self) -> Tuple[List[Union[Goto, str]], Dict[str, CodeVar]]:
+    def process(self, packed: bool = False) -> Tuple[List[Union[Goto, str]], Dict[str, CodeVar]]:
         decls: Dict[str, CodeVar] = {}
         stack: Stack = Stack("__stack")
+        stack.packed = packed
 
-        code: CodeBuffer = CodeBuffer(decls, stack)
-        declarations_code: CodeBuffer = CodeBuffer(decls, stack)
+        self.cache = LoweringCache(decls, stack)
+        code: CodeBuffer = CodeBuffer(decls, stack, self.cache)
+        declarations_code: CodeBuffer = CodeBuffer(decls, stack, self.cache)
 
         pos = 0
         for i in chain(self.declarations.values(), [stack]):
@@ -28,13 +37,24 @@ class ASTFile:
             decls[name] = var
             pos += var.get_size()
 
+        Liveness(self.code, decls).process()
+        boundaries = []
         for i in self.code:
+            boundaries.append(len(code.queue))
             code.write(i)
+        boundaries.append(len(code.queue))
+
+        if stack.scratch_size != 0:
+            var = decls.pop(stack.name)
+            decls[stack.name + SCRATCH_SUFFIX] = CodeVar(var.pos, StringCodeType(stack.scratch_size))
+            decls[stack.name] = CodeVar(var.pos + stack.scratch_size, var.type)
 
         for i in chain([stack], self.declarations.values()):
-            i.process(decls, stack, declarations_code)
+            declarations_code.extend(i.process(decls, stack))
 
         if stack.current != 0:
             raise Exception("Stack not empty at end")
 
+        self.boundaries = [len(declarations_code.queue) + i for i in boundaries]
+
         return declarations_code.queue + code.queue, decls
@@ -1,22 +1,83 @@
-from typing import Dict, Union, List
+from typing import Dict, Iterator, Optional, Union, List
 
 from .code_stack import Stack
 from .code_var import CodeVar
 from .goto import Goto
-from .ibuffer import IBuffer
+from .ibuffer import IBuffer, Lowering
 from .iprocessable import IProcessable
+from .lowering_cache import LoweringCache, Recording
 
 
 class CodeBuffer(IBuffer):
-    def __init__(self, declarations: Dict[str, CodeVar], stack: Stack):
+    def __init__(self, declarations: Dict[str, CodeVar], stack: Stack, cache: Optional[LoweringCache] = None):
         self.declarations: Dict[str, CodeVar] = declarations
         self.stack: Stack = stack
+        self.cache: Optional[LoweringCache] = cache
 
         self.queue: List[Union[Goto, str]] = []
 
     def write(self, data: Union[Goto, str, IProcessable]) -> None:
         if isinstance(data, IProcessable):
-            data.process(self.declarations, self.stack, self)
+            self.extend(data.process(self.declarations, self.stack))
             return
 
         self.queue.append(data)
+
+    def extend(self, code: Lowering) -> None:
+        self.queue.extend(self.lower(code))
+
+    def lower(self, code: Lowering) -> Iterator[Union[Goto, str]]:
+        """Streams the code of a lowering with all the nested nodes lowered in place.
+
+        The lowerings of the nested nodes are kept on an explicit stack instead of the call stack, a nested node is run
+        to its end before its parent resumes, so the stack is pushed and popped in the same order as by recursion.
+        Nodes found in the cache are replayed instead, the others are recorded while they are lowered.
+        """
+        work: List[Lowering] = [code]
+        # recording of every lowering in work, None if it is not cached
+        recordings: List[Optional[Recording]] = [None]
+        active: List[Recording] = []
+        while len(work) != 0:
+            item = next(work[-1], None)
+            if item is None:
+                work.pop()
+                recording = recordings.pop()
+                if recording is not None:
+                    active.pop()
+                    self.cache.put(recording.key, recording.finish())
+                continue
+            if not isinstance(item, IProcessable):
+                for i in active:
+                    i.code.append(item)
+                yield item
+                continue
+
+            key = None if self.cache is None else self.cache.key(item)
+            if key is None:
+                self.guard(item, active)
+                work.append(item.process(self.declarations, self.stack))
+                recordings.append(None)
+                continue
+            key, operands, names = key
+            template = self.cache.get(key, names)
+            if template is not None:
+                for i in active:
+                    i.inherit(template, names)
+                for f in self.cache.replay(template, operands, names):
+                    for i in active:
+                        i.code.append(f)
+                    yield f
+                continue
+            recording = Recording(key, operands, names, self.stack)
+            active.append(recording)
+            self.guard(item, active)
+            work.append(item.process(self.declarations, self.stack))
+            recordings.append(recording)
+
+    def guard(self, node: IProcessable, active: List[Recording]) -> None:
+        if len(active) == 0:
+            return
+        guard = node.guard(self.declarations, self.stack)
+        if guard is not None:
+            for i in active:
+                i.guard(node, guard)
@@ -39,3 +39,12 @@ class IndexGetter(IGetter):
         if not isinstance(other, type(self)):
             return False
         return self.getter == other.getter and self.index == other.index
+
+
+class CellGetter(IndexGetter):
+    """Cell of a string counting its tail, not checked against the length like the items."""
+
+    def get_var(self, declarations: Dict[str, CodeVar]) -> CodeVar:
+        var = self.getter.get_var(declarations)
+        assert isinstance(var.type, StringCodeType), "Getting element from not array"
+        return var.type.get_cell(var, self.index)
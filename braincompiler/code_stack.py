@@ -1,28 +1,35 @@
-from typing import Dict, List, Union, Tuple
+from typing import Dict, Tuple
 
 from .code_getters import IndexGetter, VarGetter
 from .code_types import StringCodeType
 from .code_var import CodeVar
-from .goto import Goto
-from .ibuffer import IBuffer
+from .ibuffer import Lowering
 from .ideclaration import IDeclaration
 
+SCRATCH_SUFFIX = "_scratch"
+
 
 class Stack(IDeclaration):
     def __init__(self, name: str):
         super(Stack, self).__init__(name, 0)
         self.size: int = 0
         self.current: int = 0
+        self.scratch_size: int = 0
+        # temporaries are placed next to their uses by the layout pass, instead of after every declaration
+        self.packed: bool = False
 
-    def process(self, declarations: Dict[str, CodeVar], stack, out: IBuffer) -> List[Union[Goto, str]]:
-        data: List[Union[Goto, str]] = []
-        for i in range(self.size):
-            data += [Goto(IndexGetter(VarGetter(self.name), i)), "[-]"]
-        return data
+    def process(self, declarations: Dict[str, CodeVar], stack) -> Lowering:
+        # the tape starts zeroed and every temporary is cleared before use
+        return iter(())
 
     def key(self, pos: int) -> Tuple[str, CodeVar]:
         return self.name, CodeVar(pos, StringCodeType(2 ** 64))
 
+    def scratch(self, size: int) -> VarGetter:
+        """Contiguous zeroed cells for code moving the pointer by itself, which has to leave them zeroed."""
+        self.scratch_size = max(self.scratch_size, size)
+        return VarGetter(self.name + SCRATCH_SUFFIX)
+
     def push(self) -> IndexGetter:
         self.current += 1
         self.size = max(self.size, self.current)
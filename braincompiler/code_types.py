@@ -1,3 +1,5 @@
+from typing import Dict
+
 from .code_var import CodeVar
 from .icode_type import ICodeType
 
@@ -8,12 +10,32 @@ class IntCodeType(ICodeType):
 
 
 class StringCodeType(ICodeType):
-    def __init__(self, len_: int):
+    def __init__(self, len_: int, tail: int = 0):
         self.len_: int = len_
+        # zeroed cells after the items, walked through by dynamic indexing
+        self.tail: int = tail
 
     def get_size(self) -> int:
-        return IntCodeType().get_size() * self.len_
+        return IntCodeType().get_size() * (self.len_ + self.tail)
 
     def get_item(self, var: CodeVar, n: int) -> CodeVar:
         assert n < self.len_, "index not in string"
+        return self.get_cell(var, n)
+
+    def get_cell(self, var: CodeVar, n: int) -> CodeVar:
+        """Item or tail cell, for the code working on the tail."""
+        assert n < self.len_ + self.tail, "cell not in string"
         return CodeVar(var.pos + IntCodeType().get_size() * n, IntCodeType())
+
+
+class ScatteredCodeType(StringCodeType):
+    """Array whose items are placed at arbitrary cells instead of following each other."""
+
+    def __init__(self, len_: int, positions: Dict[int, int]):
+        super(ScatteredCodeType, self).__init__(len_)
+        self.positions: Dict[int, int] = positions
+
+    def get_cell(self, var: CodeVar, n: int) -> CodeVar:
+        if n in self.positions.keys():
+            return CodeVar(self.positions[n], IntCodeType())
+        return super(ScatteredCodeType, self).get_cell(var, n)
@@ -0,0 +1,63 @@
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+from .c_linker import CLinker
+from .code_ast import ASTFile
+from .lexer import CodeLexer
+from .linker import CodeLinker
+from .parser import local_parser
+from .preprocessor import Preprocessor
+
+TARGETS = {"bf": CodeLinker, "c": CLinker}
+
+Source = Union[str, Tuple[str, Dict[str, str]]]
+
+
+class Compiler:
+    """Compilation session with fixed options.
+
+    The lexer and parser tables are built once per process and every thread parses with its own parser, all the
+    state of a compilation (declarations, stack, code queue) is created per call, so a single Compiler can be shared
+    between threads.
+    """
+
+    def __init__(self, optimize: int = 0, target: str = "bf", evaluate: int = 0):
+        if target not in TARGETS.keys():
+            raise Exception(f"Unknown target {target}")
+        self.optimize: int = optimize
+        self.target: str = target
+        self.evaluate: int = evaluate
+        # build the shared lexer up front
+        CodeLexer()
+
+    def parse(self, source: str, definitions: Dict[str, str] = None) -> ASTFile:
+        if definitions is None:
+            definitions = {}
+        tokens: Dict[str, List] = {}
+        for i, f in definitions.items():
+            lexer = CodeLexer()
+            lexer.lexer.input(f)
+            tokens[i] = list(lexer.lexer)
+
+        code_parser = local_parser(CodeLexer.tokens, CodeLexer.literals)
+        a: ASTFile = code_parser.parse(input=source + "\n", lexer=Preprocessor(declarations=tokens))
+
+        if not code_parser.parser.errorok:
+            raise Exception
+        return a
+
+    def linker(self, source: str, definitions: Dict[str, str] = None) -> CodeLinker:
+        return TARGETS[self.target](self.parse(source, definitions), self.optimize, evaluate=self.evaluate)
+
+    def compile_chunks(self, source: str, definitions: Dict[str, str] = None) -> Iterator[str]:
+        return self.linker(source, definitions).iter_chunks()
+
+    def compile(self, source: str, definitions: Dict[str, str] = None) -> str:
+        return "".join(self.compile_chunks(source, definitions))
+
+    def compile_many(self, sources: Iterable[Source]) -> Iterator[str]:
+        """Compiles sources in order, each one is a string or a (source, definitions) pair."""
+        for i in sources:
+            if isinstance(i, str):
+                yield self.compile(i)
+            else:
+                yield self.compile(*i)
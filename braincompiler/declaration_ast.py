@@ -1,12 +1,20 @@
-from typing import Dict, Tuple
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Dict, Tuple, List
 
+from .ast_iadd_int import ASTIaddInt
+from .ast_list_walk import LIST_TAIL
 from .ast_set_int import ASTSetInt
-from .code_buffer import CodeBuffer
 from .code_getters import VarGetter, IndexGetter
 from .code_stack import Stack
 from .code_types import IntCodeType, StringCodeType
 from .code_var import CodeVar
+from .ibuffer import Lowering
 from .ideclaration import IDeclaration
+from .util import const_cost, const_plain_cost
+
+# widest range of byte values seeded from a single base
+MAX_SPREAD = 64
 
 
 class ASTIntDeclaration(IDeclaration):
@@ -16,8 +24,8 @@ class ASTIntDeclaration(IDeclaration):
         self.start: int
         super(ASTIntDeclaration, self).__init__(name, start)
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
-        out.write(ASTSetInt([VarGetter(self.name)], self.start))
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        yield ASTSetInt([VarGetter(self.name)], self.start)
 
     def key(self, pos: int) -> Tuple[str, CodeVar]:
         return self.name, CodeVar(pos, IntCodeType())
@@ -29,13 +37,51 @@ class ASTStringDeclaration(IDeclaration):
             raise Exception(f"Incorrect type of start value of {name}")
         self.start: bytes
         super(ASTStringDeclaration, self).__init__(name, start)
+        # indexed by a var somewhere in the code, only then the tail is reserved after the items
+        self.indexed: bool = False
 
     def __str__(self):
         return f"string {self.name}={repr(self.start)}"
 
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: CodeBuffer) -> None:
-        for i, f in enumerate(self.start):
-            out.write(ASTSetInt([IndexGetter(VarGetter(self.name), i)], f))
+    def clusters(self) -> List[Tuple[int, List[int]]]:
+        """Splits the byte values into ranges sharing a base value, as (base, values) pairs.
+
+        The ranges are found by dynamic programming over the sorted distinct values, each range costing the seeding of
+        all its cells to the median plus the deltas to every single value.
+        """
+        values = sorted(set(self.start))
+        counts = [0] + list(accumulate(self.start.count(i) for i in values))
+        sums = [0] + list(accumulate(i * self.start.count(i) for i in values))
+
+        def cluster(first: int, last: int) -> Tuple[float, int]:
+            size = counts[last + 1] - counts[first]
+            median = bisect_left(counts, counts[first] + (size + 1) // 2, first + 1, last + 2) - 1
+            base = values[median]
+            deviation = base * (counts[median] - counts[first]) - (sums[median] - sums[first])
+            deviation += sums[last + 1] - sums[median + 1] - base * (counts[last + 1] - counts[median + 1])
+            return const_cost(base, size) + const_plain_cost(1) * deviation, base
+
+        # best[n] - cost of the values before n, with the start of the last range
+        best: List[Tuple[float, int]] = [(0, 0)]
+        for last in range(len(values)):
+            first = bisect_left(values, values[last] - MAX_SPREAD, 0, last)
+            best.append(min((best[n][0] + cluster(n, last)[0], n) for n in range(first, last + 1)))
+
+        data = []
+        last = len(values)
+        while last != 0:
+            first = best[last][1]
+            data.append((cluster(first, last - 1)[1], values[first:last]))
+            last = first
+        return data[::-1]
+
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
+        for base, values in self.clusters():
+            cells = [i for i, f in enumerate(self.start) if f in values]
+            yield ASTSetInt([IndexGetter(VarGetter(self.name), i) for i in cells], base)
+            for i in cells:
+                if self.start[i] != base:
+                    yield ASTIaddInt([IndexGetter(VarGetter(self.name), i)], self.start[i] - base)
 
     def key(self, pos: int) -> Tuple[str, CodeVar]:
-        return self.name, CodeVar(pos, StringCodeType(len(self.start)))
+        return self.name, CodeVar(pos, StringCodeType(len(self.start), LIST_TAIL if self.indexed else 0))
@@ -1,3 +1,14 @@
+from typing import Iterator, Union, TYPE_CHECKING
+
+from .goto import Goto
+
+if TYPE_CHECKING:
+    from .iprocessable import IProcessable
+
+# what lowering a node yields: code in order, with nested nodes to be lowered in their place
+Lowering = Iterator[Union[Goto, str, "IProcessable"]]
+
+
 class IBuffer:
     def write(self, data) -> None:
         raise Exception
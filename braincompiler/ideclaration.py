@@ -1,7 +1,7 @@
 from typing import Dict, Tuple
 
 from .code_var import CodeVar
-from .ibuffer import IBuffer
+from .ibuffer import Lowering
 
 
 class IDeclaration:
@@ -9,7 +9,7 @@ class IDeclaration:
         self.start = start
         self.name: str = name
 
-    def process(self, declarations: Dict[str, CodeVar], stack, out: IBuffer) -> None:
+    def process(self, declarations: Dict[str, CodeVar], stack) -> Lowering:
         raise Exception
 
     def key(self, pos: int) -> Tuple[str, CodeVar]:
@@ -1,10 +1,17 @@
-from typing import Dict
+from typing import Dict, Optional
 
 from .code_stack import Stack
 from .code_var import CodeVar
-from .ibuffer import IBuffer
+from .ibuffer import Lowering
 
 
 class IProcessable:
-    def process(self, declarations: Dict[str, CodeVar], stack: Stack, out: IBuffer) -> None:
+    # whether the lowering is worth caching, nodes with nested statements are never cached
+    memoize: bool = True
+
+    def process(self, declarations: Dict[str, CodeVar], stack: Stack) -> Lowering:
         raise Exception
+
+    def guard(self, declarations: Dict[str, CodeVar], stack: Stack) -> Optional[tuple]:
+        """Choices of the lowering that depend on the cells of the vars, checked before a cached lowering is replayed."""
+        return None
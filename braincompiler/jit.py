@@ -0,0 +1,121 @@
+import hashlib
+from collections import OrderedDict
+from types import CodeType
+from typing import Dict, List, Iterable, Union
+
+from .code_ast import ASTFile
+from .code_var import CodeVar
+from .goto import Goto
+from .runtime import ADD, MOVE, SET, MUL, JZ, JNZ, SCAN, OUT, IN, CodeRuntime, IRBuilder
+
+# python refuses more than 20 statically nested blocks, deeper loops are moved to separate functions
+MAX_DEPTH = 16
+
+code_cache: "OrderedDict[str, CodeType]" = OrderedDict()
+CODE_CACHE_SIZE = 64
+
+
+def compile_source(source: str) -> CodeType:
+    key = hashlib.sha256(source.encode()).hexdigest()
+    if key in code_cache:
+        code_cache.move_to_end(key)
+        return code_cache[key]
+    code = compile(source, f"<brainfuck {key[:16]}>", "exec")
+    code_cache[key] = code
+    if len(code_cache) > CODE_CACHE_SIZE:
+        code_cache.popitem(last=False)
+    return code
+
+
+def cell(off: int) -> str:
+    if off == 0:
+        return "m[p]"
+    if off > 0:
+        return f"m[p + {off}]"
+    return f"m[p - {-off}]"
+
+
+class CodeJit:
+    """Translates the runtime IR into python source compiled once into a code object."""
+
+    def __init__(self, runtime: CodeRuntime):
+        self.runtime: CodeRuntime = runtime
+        self.functions: List[List[str]] = []
+        self.source: str = self.generate()
+        self.code: CodeType = compile_source(self.source)
+
+        namespace = {}
+        exec(self.code, namespace)
+        self.entry = namespace["f0"]
+
+    @classmethod
+    def from_code(cls, code: Iterable[str]) -> "CodeJit":
+        return cls(CodeRuntime.from_code(code))
+
+    @classmethod
+    def from_queue(cls, code: Iterable[Union[Goto, str]], declarations: Dict[str, CodeVar]) -> "CodeJit":
+        return cls(CodeRuntime.from_queue(code, declarations))
+
+    @classmethod
+    def from_file(cls, code: ASTFile) -> "CodeJit":
+        builder = IRBuilder()
+        builder.feed_queue(*code.process())
+        return cls(builder.build())
+
+    def generate(self) -> str:
+        self.functions = []
+        self.function(0)
+        return "\n".join("\n".join(i) for i in reversed(self.functions)) + "\n"
+
+    def function(self, pc: int) -> int:
+        """Generates a function running the code from pc until the end of the enclosing loop."""
+        lines: List[str] = [f"def f{pc}(m, p, inp, out):"]
+        self.functions.append(lines)
+        rt = self.runtime
+        depth = 1
+        while pc < len(rt.ops):
+            op, a, b = rt.ops[pc], rt.arg_a[pc], rt.arg_b[pc]
+            indent = "    " * depth
+            if op == ADD:
+                lines.append(f"{indent}{cell(a)} = ({cell(a)} + {b}) & 255")
+            elif op == MOVE:
+                lines.append(f"{indent}p += {a}")
+            elif op == SET:
+                lines.append(f"{indent}{cell(a)} = {b}")
+            elif op == MUL:
+                for off, num in rt.mul_targets[a]:
+                    lines.append(f"{indent}{cell(off)} = ({cell(off)} + m[p] * {num}) & 255")
+                lines.append(f"{indent}m[p] = 0")
+            elif op == SCAN:
+                if a == 1:
+                    lines.append(f"{indent}p = m.index(0, p)")
+                elif a == -1:
+                    lines.append(f"{indent}p = m.rindex(0, 0, p + 1)")
+                else:
+                    lines.append(f"{indent}while m[p]:")
+                    lines.append(f"{indent}    p += {a}")
+            elif op == OUT:
+                lines.append(f"{indent}out.append({cell(a)})")
+            elif op == IN:
+                lines.append(f"{indent}{cell(a)} = next(inp, 0)")
+            elif op == JZ:
+                lines.append(f"{indent}while m[p]:")
+                if depth == MAX_DEPTH:
+                    lines.append(f"{indent}    p = f{pc + 1}(m, p, inp, out)")
+                    pc = self.function(pc + 1)
+                    continue
+                depth += 1
+            elif op == JNZ:
+                if rt.ops[pc - 1] == JZ:
+                    lines.append(f"{indent}pass")
+                if depth == 1:
+                    break
+                depth -= 1
+            pc += 1
+        lines.append("    return p")
+        return pc + 1
+
+    def run(self, inp: Iterable[int] = b"", mem_len: int = 30000) -> bytearray:
+        out = bytearray()
+        self.entry(bytearray(mem_len), 0, iter(inp), out)
+        return out
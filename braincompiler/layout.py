@@ -0,0 +1,167 @@
+from bisect import bisect_right
+from typing import Dict, List, Union, Tuple, Optional, Iterable, Set
+
+from .code_stack import SCRATCH_SUFFIX
+from .code_types import ScatteredCodeType, StringCodeType
+from .code_var import CodeVar
+from .goto import Goto
+
+Unit = Tuple[str, int]
+
+LOOP_WEIGHT = 8
+MAX_SWEEPS = 16
+
+
+class LayoutOptimizer:
+    """Places variables and stack slots to minimize the pointer travel between consecutive Gotos.
+
+    Every declaration is a unit kept contiguous, every used stack slot is a unit of its own. Transitions are counted
+    over the code queue, weighted by loop depth, then units are ordered greedily by affinity and improved by swapping
+    neighbours. Code with asm movements relies on the declaration order and is left as is, only the movements of
+    kernels starting in the scratch cells or in the tail of a string are allowed, as they stay inside the unit.
+    """
+
+    def __init__(self, code: List[Union[Goto, str]], declarations: Dict[str, CodeVar], stack: str = "__stack"):
+        self.code: List[Union[Goto, str]] = code
+        self.declarations: Dict[str, CodeVar] = declarations
+        self.stack: str = stack
+
+        self.sizes: Dict[Unit, int] = {}
+        self.transitions: Dict[Tuple[Unit, int, Unit, int], int] = {}
+        self.keys: Dict[Unit, List[Tuple[Unit, int, Unit, int]]] = {}
+
+    def process(self) -> Dict[str, int]:
+        self.count()
+        if len(self.transitions) != 0 and self.movable():
+            self.apply(self.improve(self.order()))
+        return self.layout()
+
+    def movable(self) -> bool:
+        areas: List[Tuple[int, int]] = []
+        for name, var in self.declarations.items():
+            if name == self.stack + SCRATCH_SUFFIX:
+                areas.append((var.pos, var.pos + var.get_size()))
+            elif name != self.stack and isinstance(var.type, StringCodeType) and var.type.tail != 0:
+                areas.append((var.type.get_cell(var, var.type.len_).pos, var.pos + var.get_size()))
+        pos: Optional[int] = None
+        for i in self.code:
+            if isinstance(i, Goto):
+                pos = i.var.get_var(self.declarations).pos
+                continue
+            if "<" not in i and ">" not in i:
+                continue
+            if pos is None or not any(start <= pos < end for start, end in areas):
+                return False
+        return True
+
+    def report(self) -> Dict[str, int]:
+        self.count()
+        return self.layout()
+
+    def layout(self) -> Dict[str, int]:
+        data: Dict[str, int] = {}
+        for name, var in self.declarations.items():
+            if name != self.stack:
+                data[name] = var.pos
+        stack = self.declarations[self.stack]
+        for n in sorted(i[1] for i in self.sizes.keys() if i[0] == self.stack):
+            data[f"{self.stack}[{n}]"] = stack.type.get_item(stack, n).pos
+        return data
+
+    def count(self) -> None:
+        stack_pos = self.declarations[self.stack].pos
+        units = sorted((var.pos, name) for name, var in self.declarations.items() if name != self.stack)
+        starts = [i[0] for i in units]
+        for pos, name in units:
+            self.sizes[(name, 0)] = self.declarations[name].get_size()
+
+        depth = 0
+        last: Optional[Tuple[Unit, int]] = None
+        for i in self.code:
+            if isinstance(i, str):
+                depth += i.count("[") - i.count("]")
+                continue
+            pos = i.var.get_var(self.declarations).pos
+            if pos >= stack_pos:
+                current = ((self.stack, pos - stack_pos), 0)
+                self.sizes[current[0]] = 1
+            else:
+                n = bisect_right(starts, pos) - 1
+                current = ((units[n][1], 0), pos - starts[n])
+            if last is not None and last[0] != current[0]:
+                key = last + current if last < current else current + last
+                if key not in self.transitions.keys():
+                    self.transitions[key] = 0
+                    self.keys.setdefault(key[0], []).append(key)
+                    self.keys.setdefault(key[2], []).append(key)
+                self.transitions[key] += LOOP_WEIGHT ** depth
+            last = current
+
+    def positions(self, order: List[Unit]) -> Dict[Unit, int]:
+        data: Dict[Unit, int] = {}
+        pos = 0
+        for i in order:
+            data[i] = pos
+            pos += self.sizes[i]
+        return data
+
+    def cost(self, positions: Dict[Unit, int], keys: Iterable[Tuple[Unit, int, Unit, int]]) -> int:
+        cost = 0
+        for key in keys:
+            a, a_off, b, b_off = key
+            if a in positions.keys() and b in positions.keys():
+                cost += self.transitions[key] * abs(positions[a] + a_off - positions[b] - b_off)
+        return cost
+
+    def order(self) -> List[Unit]:
+        affinity: Dict[Unit, Dict[Unit, int]] = {i: {} for i in self.sizes.keys()}
+        for (a, _, b, _), w in self.transitions.items():
+            affinity[a][b] = affinity[a].get(b, 0) + w
+            affinity[b][a] = affinity[b].get(a, 0) + w
+
+        first = max(self.sizes.keys(), key=lambda i: sum(affinity[i].values()))
+        order: List[Unit] = [first]
+        placed: Set[Unit] = {first}
+        links: Dict[Unit, int] = dict(affinity[first])
+        while len(links) != 0:
+            unit = max(links.keys(), key=lambda i: links[i])
+            del links[unit]
+            placed.add(unit)
+            left = self.cost(self.positions([unit] + order), self.keys[unit])
+            right = self.cost(self.positions(order + [unit]), self.keys[unit])
+            order = [unit] + order if left < right else order + [unit]
+            for i, w in affinity[unit].items():
+                if i not in placed:
+                    links[i] = links.get(i, 0) + w
+        return order + [i for i in self.sizes.keys() if i not in placed]
+
+    def improve(self, order: List[Unit]) -> List[Unit]:
+        positions = self.positions(order)
+        for _ in range(MAX_SWEEPS):
+            changed = False
+            for i in range(len(order) - 1):
+                a, b = order[i], order[i + 1]
+                keys = set(self.keys.get(a, [])) | set(self.keys.get(b, []))
+                before = self.cost(positions, keys)
+                pos = positions[a]
+                positions[b], positions[a] = pos, pos + self.sizes[b]
+                if self.cost(positions, keys) < before:
+                    order[i], order[i + 1] = b, a
+                    changed = True
+                else:
+                    positions[a], positions[b] = pos, pos + self.sizes[a]
+            if not changed:
+                break
+        return order
+
+    def apply(self, order: List[Unit]) -> None:
+        positions = self.positions(order)
+        slots: Dict[int, int] = {}
+        for unit, pos in positions.items():
+            if unit[0] == self.stack:
+                slots[unit[1]] = pos
+            else:
+                self.declarations[unit[0]] = CodeVar(pos, self.declarations[unit[0]].type)
+        end = sum(self.sizes.values())
+        stack = self.declarations[self.stack]
+        self.declarations[self.stack] = CodeVar(end, ScatteredCodeType(stack.type.len_, slots))
@@ -1,5 +1,9 @@
+from threading import Lock
+
 from ply import lex
 
+from .tables import grammar_hash, load_table, output_dir, rules, table_name
+
 
 class CodeLexer:
     keywords = (
@@ -23,8 +27,25 @@ class CodeLexer:
     t_IRSHIFT = r'>>='
     t_DEFINE = r'\#define'
 
+    # lexer built from the cached tables, every CodeLexer gets its own clone of it
+    master = None
+    master_lock = Lock()
+
     def __init__(self, **kwargs):
-        self.lexer = lex.lex(module=self, **kwargs)
+        if len(kwargs) != 0:
+            self.lexer = lex.lex(module=self, **kwargs)
+            return
+        with CodeLexer.master_lock:
+            if CodeLexer.master is None:
+                CodeLexer.master = self.build()
+        self.lexer = CodeLexer.master.clone()
+
+    def build(self):
+        name = table_name("lextab", grammar_hash(tuple(self.tokens), tuple(self.literals), rules(CodeLexer, "t_")))
+        lextab = load_table(name)
+        if lextab is None:
+            return lex.lex(module=self, optimize=1, lextab=name, outputdir=output_dir())
+        return lex.lex(module=self, optimize=1, lextab=lextab)
 
     def t_STRING(self, t):
         r'\".*?\"'
@@ -1,26 +1,164 @@
+from typing import Iterator, List, Tuple, Dict, Union, Optional
+
+from .allocator import StackAllocator
+from .cell_ir import CellIR, Statement
 from .code_ast import ASTFile
+from .code_var import CodeVar
 from .goto import Goto
-from .util import bf_move
+from .layout import LayoutOptimizer
+from .optimizer import CodeOptimizer
+from .partial_eval import PartialEvaluator
+from .util import bf_move, bf_add, wrap
+from .value_tracker import ValueTracker
 
 
 class CodeLinker:
-    def __init__(self, code: ASTFile):
+    def __init__(self, code: ASTFile, optimize: int = 0, chunk_size: int = 1 << 16, evaluate: int = 0):
         self.code: ASTFile = code
+        self.optimize: int = optimize
+        self.chunk_size: int = chunk_size
+        # step budget for running the input independent prefix at compile time, 0 - disabled
+        self.evaluate: int = evaluate
+        self.pos: int = 0
+        self.layout_data: Optional[Dict[str, int]] = None
+        # the layout is only counted when asked for, most compiles never read it
+        self.layout_pass: Optional[LayoutOptimizer] = None
+
+    @property
+    def layout(self) -> Dict[str, int]:
+        if self.layout_data is None:
+            if self.layout_pass is None:
+                return {}
+            self.layout_data = self.layout_pass.report()
+        return self.layout_data
 
     def process(self) -> str:
-        code, declarations = self.code.process()
+        return "".join(self.iter_chunks())
+
+    def iter_chunks(self) -> Iterator[str]:
+        if self.optimize >= 1:
+            return CodeOptimizer(self.link()).iter_chunks()
+        return self.link()
+
+    def queue(self) -> Tuple[List[Union[Goto, str]], Dict[str, CodeVar]]:
+        code, declarations = self.code.process(self.optimize >= 3)
+        if self.evaluate > 0:
+            code = PartialEvaluator(code, declarations, self.code.boundaries, self.evaluate).process()
+        if self.optimize >= 3:
+            code = StackAllocator(code, declarations).process()
+        self.layout_pass = LayoutOptimizer(code, declarations)
+        if self.optimize >= 3:
+            self.layout_data = self.layout_pass.process()
+        if self.optimize >= 2:
+            code = ValueTracker(code, declarations).process()
+        return code, declarations
+
+    def link(self) -> Iterator[str]:
+        if self.optimize >= 3:
+            yield from self.chunks(self.link_cells())
+            return
+        code, declarations = self.queue()
         pos = 0
-        data = ""
+        data: List[str] = []
+        size = 0
         for i in code:
-            if isinstance(i, str):
-                data += i
-                continue
             if isinstance(i, Goto):
                 var = i.var.get_var(declarations).pos
-                data += bf_move(var - pos)
+                i = bf_move(var - pos)
                 pos = var
-                continue
+            elif not isinstance(i, str):
+                raise Exception
+
+            data.append(i)
+            size += len(i)
+            if size >= self.chunk_size:
+                yield "".join(data)
+                data = []
+                size = 0
 
-            raise Exception
+        if data:
+            yield "".join(data)
+
+    def chunks(self, code: Iterator[str]) -> Iterator[str]:
+        data: List[str] = []
+        size = 0
+        for i in code:
+            data.append(i)
+            size += len(i)
+            if size >= self.chunk_size:
+                yield "".join(data)
+                data = []
+                size = 0
+        if data:
+            yield "".join(data)
+
+    def link_cells(self) -> Iterator[str]:
+        """Emits the cell IR materializing the pointer, updates between io and loops are ordered by travel distance."""
+        self.pos = 0
+        yield from self.emit_cells(CellIR(*self.queue()).process(), None)
+
+    def goto(self, cell: int) -> str:
+        move = bf_move(cell - self.pos)
+        self.pos = cell
+        return move
+
+    def emit_cells(self, code: List[Statement], end: Optional[int]) -> Iterator[str]:
+        # [statements, next statement, cell the pointer ends at, loop start or None] - loop bodies are entered by
+        # pushing a frame instead of recursing, so deep nesting does not hit the recursion limit
+        frames: List[list] = [[code, 0, end, None]]
+        while len(frames) != 0:
+            frame = frames[-1]
+            code, n, end = frame[0], frame[1], frame[2]
+            if n == len(code):
+                frames.pop()
+                if frame[3] is not None:
+                    yield self.goto(end)
+                    yield "]"
+                    self.pos = frame[3]
+                continue
+            kind = code[n][0]
+            frame[1] = n + 1
+            if kind in ("add", "set"):
+                m = n
+                while m < len(code) and code[m][0] in ("add", "set"):
+                    m += 1
+                barrier = code[m][1] if m < len(code) and code[m][0] != "shift" else end
+                for i in self.schedule(code[n:m], barrier):
+                    yield self.goto(i[1])
+                    yield "[-]" + bf_add(wrap(i[2])) if i[0] == "set" else bf_add(wrap(i[2]))
+                frame[1] = m
+                continue
+            match kind:
+                case "mul":
+                    start = code[n][1]
+                    yield self.goto(start)
+                    yield "[-"
+                    targets = sorted(code[n][2], key=lambda t: (t[0] > start, -t[0] if t[0] < start else t[0]))
+                    for cell, num in targets:
+                        yield self.goto(cell)
+                        yield bf_add(wrap(num))
+                    yield self.goto(start)
+                    yield "]"
+                case "out":
+                    yield self.goto(code[n][1])
+                    yield "."
+                case "in":
+                    yield self.goto(code[n][1])
+                    yield ","
+                case "loop":
+                    start = code[n][1]
+                    body = code[n][2]
+                    close = start + body[-1][1] if len(body) != 0 and body[-1][0] == "shift" else start
+                    yield self.goto(start)
+                    yield "["
+                    frames.append([body, 0, close, start])
 
-        return data
+    def schedule(self, code: List[Statement], end: Optional[int]) -> List[Statement]:
+        """Orders updates of distinct cells as one sweep over their range, picking the cheaper direction."""
+        code = sorted(code, key=lambda i: i[1])
+        low, high = code[0][1], code[-1][1]
+        if end is None:
+            end = self.pos
+        forward = abs(self.pos - low) + abs(high - end)
+        backward = abs(self.pos - high) + abs(low - end)
+        return code if forward <= backward else code[::-1]
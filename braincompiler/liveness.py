@@ -0,0 +1,89 @@
+from typing import Dict, List, Iterator, Optional, Tuple
+
+from .ast_if import ASTIf
+from .ast_if_elif import ASTIfElif
+from .ast_set_int import ASTSetInt
+from .ast_set_var import ASTSetVar
+from .base_ast import ASTAssembler, ASTGoto, ASTIn
+from .code_getters import IGetter
+from .code_var import CodeVar
+from .iprocessable import IProcessable
+
+
+class Liveness:
+    """Marks the tests of ifs whose var is overwritten before being read again, so the test can consume it.
+
+    Only the statements following an if in its own block are looked at, the end of a nested block keeps the var alive
+    while the end of the file kills it. asm and goto read everything.
+    """
+
+    def __init__(self, code: List[IProcessable], declarations: Dict[str, CodeVar]):
+        self.code: List[IProcessable] = code
+        self.declarations: Dict[str, CodeVar] = declarations
+
+    def process(self) -> None:
+        # blocks are independent of each other, a worklist keeps deep nesting off the call stack
+        work: List[Tuple[List[IProcessable], bool]] = [(self.code, True)]
+        while len(work) != 0:
+            code, dead_end = work.pop()
+            self.block(code, dead_end)
+            work.extend((f, False) for i in code for f in self.blocks(i))
+
+    def block(self, code: List[IProcessable], dead_end: bool) -> None:
+        for n, i in enumerate(code):
+            if isinstance(i, ASTIf):
+                i.consume = self.dead(i.test_var, code[n + 1:], dead_end)
+            elif isinstance(i, ASTIfElif):
+                i.consume = {m for m, (test_var, _) in enumerate(i.data) if self.dead(test_var, code[n + 1:], dead_end)}
+
+    @staticmethod
+    def blocks(node: IProcessable) -> Iterator[List[IProcessable]]:
+        for i in vars(node).values():
+            if not isinstance(i, list):
+                continue
+            for f in i:
+                if isinstance(f, IProcessable):
+                    yield i
+                    break
+                if isinstance(f, tuple):
+                    yield from (g for g in f if isinstance(g, list))
+
+    def cells(self, getter: IGetter) -> Tuple[int, int]:
+        var = getter.get_var(self.declarations)
+        return var.pos, var.pos + var.get_size()
+
+    def mentions(self, value, cell: int) -> bool:
+        work = [value]
+        while len(work) != 0:
+            value = work.pop()
+            if isinstance(value, (ASTAssembler, ASTGoto)):
+                return True
+            if isinstance(value, IGetter):
+                start, end = self.cells(value)
+                if start <= cell < end:
+                    return True
+            elif isinstance(value, IProcessable):
+                work.extend(vars(value).values())
+            elif isinstance(value, (list, tuple)):
+                work.extend(value)
+        return False
+
+    def access(self, node: IProcessable, cell: int) -> Optional[str]:
+        if isinstance(node, ASTSetVar) and not self.mentions(node.right, cell) or isinstance(node, ASTSetInt):
+            if any(self.cells(i) == (cell, cell + 1) for i in node.names):
+                return "write"
+        if isinstance(node, ASTIn) and self.cells(node.name) == (cell, cell + 1):
+            return "write"
+        if self.mentions(node, cell):
+            return "read"
+        return None
+
+    def dead(self, test_var: IGetter, code: List[IProcessable], dead_end: bool) -> bool:
+        cell = test_var.get_var(self.declarations).pos
+        for i in code:
+            match self.access(i, cell):
+                case "read":
+                    return False
+                case "write":
+                    return True
+        return dead_end
@@ -0,0 +1,178 @@
+from collections import ChainMap, OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+from .code_getters import IGetter, IndexGetter, VarGetter
+from .code_stack import Stack
+from .code_types import StringCodeType
+from .code_var import CodeVar
+from .goto import Goto
+from .iprocessable import IProcessable
+
+# (stack position relative to the start of the template, node, its guard, names of its vars to the slots of the template)
+Guard = Tuple[int, IProcessable, tuple, Dict[str, str]]
+
+
+class Template:
+    """Code of a lowered node with the getters of the node it refers to, replayed for nodes of the same shape."""
+
+    def __init__(self, operands: List[IGetter], names: List[str], code: List[Union[Goto, str]], guards: List[Guard],
+                 depth: int, scratch: int):
+        self.operands: List[IGetter] = operands
+        self.names: List[str] = names
+        self.code: List[Union[Goto, str]] = code
+        # choices of the nested nodes depending on the cells of the vars, the code is replayed only if they hold
+        self.guards: List[Guard] = guards
+        # stack cells used above the stack position at the start, and scratch cells used
+        self.depth: int = depth
+        self.scratch: int = scratch
+
+
+class LoweringCache:
+    """LRU cache of the code of nodes without nested statements.
+
+    The lowering of such a node depends only on its type, its constants, which of its getters are the same, the types
+    of the vars it names and the stack position, and on the choices of constant code, which depend on the cells of the
+    vars. Vars are replaced by slots in the key, so the same operation on other vars reuses the code when the choices
+    made for them are the same, with the getters substituted on replay and stack temporaries created anew.
+    """
+
+    def __init__(self, declarations: Dict[str, CodeVar], stack: Stack, size: int = 1024):
+        self.declarations: Dict[str, CodeVar] = declarations
+        self.stack: Stack = stack
+        self.size: int = size
+
+        self.templates: OrderedDict[tuple, Template] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def key(self, node: IProcessable) -> Optional[Tuple[tuple, List[IGetter], List[str]]]:
+        """The key of a node with its getters and var names in the order of the slots, None if it is not cached."""
+        if not node.memoize:
+            return None
+        operands: List[IGetter] = []
+        names: List[str] = []
+
+        def shape(value):
+            if isinstance(value, IProcessable):
+                raise TypeError
+            if isinstance(value, IGetter):
+                same = next((n for n, i in enumerate(operands) if i is value), None)
+                if same is not None:
+                    return "same", same
+                operands.append(value)
+                return getter(value)
+            if isinstance(value, (list, tuple)):
+                return tuple(shape(i) for i in value)
+            if isinstance(value, (set, frozenset)):
+                return "set", tuple(sorted(value))
+            if value is None or isinstance(value, (int, str, bytes)):
+                return value
+            raise TypeError
+
+        def getter(value: IGetter):
+            if isinstance(value, IndexGetter):
+                return type(value), getter(value.getter), value.index
+            if not isinstance(value, VarGetter):
+                raise TypeError
+            if value.name.startswith(self.stack.name):
+                return "var", value.name
+            if value.name not in names:
+                names.append(value.name)
+            return "slot", names.index(value.name)
+
+        try:
+            data = tuple((name, shape(value)) for name, value in vars(node).items())
+        except TypeError:
+            return None
+        types = tuple(self.var_type(i) for i in names)
+        return (type(node), data, types, self.stack.current), operands, names
+
+    def var_type(self, name: str) -> tuple:
+        var = self.declarations[name]
+        if isinstance(var.type, StringCodeType):
+            return type(var.type), var.type.len_, var.type.tail
+        return type(var.type),
+
+    def get(self, key: tuple, names: List[str]) -> Optional[Template]:
+        template = self.templates.get(key)
+        if template is None or not self.holds(template, names):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.templates.move_to_end(key)
+        return template
+
+    def holds(self, template: Template, names: List[str]) -> bool:
+        """Whether the guards of the template give the same choices for the vars of the node."""
+        renames: Dict[str, str] = dict(zip(template.names, names))
+        current = self.stack.current
+        try:
+            for offset, node, guard, slots in template.guards:
+                moved = {i: self.declarations[renames.get(f, f)] for i, f in slots.items()}
+                self.stack.current = current + offset
+                if node.guard(ChainMap(moved, self.declarations), self.stack) != guard:
+                    return False
+        finally:
+            self.stack.current = current
+        return True
+
+    def put(self, key: tuple, template: Template) -> None:
+        self.templates[key] = template
+        if len(self.templates) > self.size:
+            self.templates.popitem(last=False)
+
+    def replay(self, template: Template, operands: List[IGetter], names: List[str]) -> List[Union[Goto, str]]:
+        self.stack.size = max(self.stack.size, self.stack.current + template.depth)
+        self.stack.scratch_size = max(self.stack.scratch_size, template.scratch)
+        getters: Dict[int, IGetter] = {id(i): f for i, f in zip(template.operands, operands)}
+        renames: Dict[str, str] = dict(zip(template.names, names))
+
+        def substitute(value: IGetter) -> IGetter:
+            if id(value) in getters.keys():
+                return getters[id(value)]
+            if isinstance(value, IndexGetter):
+                # temporaries pushed by the node itself, every one gets a new getter like from Stack.push
+                new = type(value)(substitute(value.getter), value.index)
+            elif isinstance(value, VarGetter):
+                new = VarGetter(renames.get(value.name, value.name))
+            else:
+                raise Exception(f"Unknown getter {value}")
+            getters[id(value)] = new
+            return new
+
+        return [Goto(substitute(i.var)) if isinstance(i, Goto) else i for i in template.code]
+
+
+class Recording:
+    """Collects the code of a node lowered for the first time, counting the stack it uses on top of the outer nodes."""
+
+    def __init__(self, key: tuple, operands: List[IGetter], names: List[str], stack: Stack):
+        self.key: tuple = key
+        self.operands: List[IGetter] = operands
+        self.names: List[str] = names
+        self.stack: Stack = stack
+        self.code: List[Union[Goto, str]] = []
+        self.guards: List[Guard] = []
+
+        self.start: int = stack.current
+        self.size: int = stack.size
+        self.scratch_size: int = stack.scratch_size
+        stack.size = stack.current
+        stack.scratch_size = 0
+
+    def guard(self, node: IProcessable, guard: tuple) -> None:
+        self.guards.append((self.stack.current - self.start, node, guard, {i: i for i in self.names}))
+
+    def inherit(self, template: Template, names: List[str]) -> None:
+        """Takes the guards of a template replayed inside the node, with its slots renamed to the vars of the node."""
+        renames: Dict[str, str] = dict(zip(template.names, names))
+        for offset, node, guard, slots in template.guards:
+            slots = {i: renames.get(f, f) for i, f in slots.items()}
+            self.guards.append((self.stack.current - self.start + offset, node, guard, slots))
+
+    def finish(self) -> Template:
+        template = Template(self.operands, self.names, self.code, self.guards, self.stack.size - self.stack.current,
+                            self.stack.scratch_size)
+        self.stack.size = max(self.size, self.stack.size)
+        self.stack.scratch_size = max(self.scratch_size, self.stack.scratch_size)
+        return template
@@ -0,0 +1,89 @@
+import re
+from typing import Iterable, Iterator, List
+
+from .util import bf_add, bf_move
+
+TOKEN = re.compile(r"\[-\]|[+-]+|[<>]+|.", re.DOTALL)
+
+
+class CodeOptimizer:
+    def __init__(self, code: Iterable[str]):
+        self.code: Iterable[str] = code
+
+        self.move: int = 0
+        self.add: int = 0
+        self.zero: bool = True
+        self.fresh: bool = True
+        self.skip: int = 0
+
+    def process(self) -> str:
+        return "".join(self.iter_chunks())
+
+    def iter_chunks(self) -> Iterator[str]:
+        for chunk in self.code:
+            out: List[str] = []
+            for token in TOKEN.finditer(chunk):
+                self.token(token.group(), out)
+            if out:
+                yield "".join(out)
+        out = []
+        self.flush(out)
+        if out:
+            yield "".join(out)
+
+    def flush(self, out: List[str]) -> None:
+        if self.move != 0:
+            out.append(bf_move(self.move))
+            if not self.fresh:
+                self.zero = False
+        add = self.add % 256
+        if add > 128:
+            add -= 256
+        if add != 0:
+            out.append(bf_add(add))
+            self.zero = False
+            self.fresh = False
+        self.move = 0
+        self.add = 0
+
+    def token(self, token: str, out: List[str]) -> None:
+        if self.skip != 0:
+            if token == "[":
+                self.skip += 1
+            elif token == "]":
+                self.skip -= 1
+            return
+
+        match token[0]:
+            case "+" | "-":
+                self.add += token.count("+") - token.count("-")
+            case ">" | "<":
+                if self.add != 0:
+                    self.flush(out)
+                self.move += token.count(">") - token.count("<")
+            case "[" if token == "[-]":
+                # cell is cleared anyway, pending additions are dead
+                self.add = 0
+                self.flush(out)
+                if not self.zero:
+                    out.append(token)
+                    self.zero = True
+            case "[":
+                self.flush(out)
+                if self.zero:
+                    self.skip = 1
+                    return
+                out.append(token)
+                self.zero = False
+            case "]":
+                self.flush(out)
+                out.append(token)
+                self.zero = True
+            case ",":
+                self.flush(out)
+                out.append(token)
+                self.zero = False
+                self.fresh = False
+            case _:
+                self.flush(out)
+                out.append(token)
@@ -1,6 +1,9 @@
+from threading import local
+
 from ply import yacc
 
 from .ast_case import ASTCase
+from .ast_divmod import ASTDivmod
 from .ast_iadd_int import ASTIaddInt
 from .ast_iadd_var import ASTIaddVar
 from .ast_idiv_int import ASTIdivInt
@@ -23,8 +26,9 @@ from .ast_set_int import ASTSetInt
 from .ast_set_var import ASTSetVar
 from .base_ast import ASTAssembler, ASTGoto, ASTIn, ASTOut, ASTWhile
 from .code_ast import *
-from .code_getters import VarGetter, IndexGetter
+from .code_getters import IGetter, VarGetter, IndexGetter
 from .declaration_ast import ASTIntDeclaration, ASTStringDeclaration
+from .tables import grammar_hash, load_table, output_dir, rules, table_name
 
 
 class CodeParser:
@@ -33,15 +37,31 @@ class CodeParser:
 
         self.tokens = tokens
         self.literals = literals
-        self.parser = yacc.yacc(module=self, **kwargs)
+        self.parser = yacc.yacc(module=self, **kwargs) if len(kwargs) != 0 else self.build()
         self.precedence = (
             ('left', '+', '-'),
             ('left', '*'),
         )
 
+    def build(self):
+        digest = grammar_hash(tuple(self.tokens), tuple(self.literals), self.start, rules(CodeParser, "p_"))
+        name = table_name("parsetab", digest)
+        parsetab = load_table(name)
+        if parsetab is None:
+            return yacc.yacc(module=self, optimize=1, debug=False, tabmodule=name, outputdir=output_dir())
+        return yacc.yacc(module=self, optimize=1, debug=False, tabmodule=parsetab)
+
     def parse(self, **kwargs):
+        self.vars_declarations = OrderedDict({})
+        # PLY clears the flag on a syntax error and never sets it back, the parser is reused by the next parse
+        self.parser.errorok = True
         return self.parser.parse(**kwargs)
 
+    def index(self, getter: IGetter):
+        """Marks a string indexed by a var, so its declaration reserves the tail walked by the indexing."""
+        if isinstance(getter, VarGetter) and isinstance(self.vars_declarations[getter.name], ASTStringDeclaration):
+            self.vars_declarations[getter.name].indexed = True
+
     start = "file"
 
     def p_file(self, p):
@@ -186,12 +206,24 @@ class CodeParser:
             case _ as e:
                 raise Exception(e)
 
+    def p_code_divmod(self, p):
+        """code     : id_list '=' id ID expr ';'
+                    | id_list '=' id ID id ';'"""
+        # divmod is a keyword only between the operands, so it can still name a var
+        if p[4] != "divmod":
+            raise Exception(f"[:{p.slice[4].lineno}]unknown operator {p[4]}")
+        if len(p[1]) != 2:
+            raise Exception(f"[:{p.slice[2].lineno}]divmod needs a quotient and a remainder")
+        p[0] = ASTDivmod(p[1][0], p[1][1], p[3], p[5])
+
     def p_code_set_list_var(self, p):
         """code     : id '[' id ']' '=' id ';' """
+        self.index(p[1])
         p[0] = ASTListSetVar(p[1], p[3], p[6])
 
     def p_code_get_list_var(self, p):
         """code     : id_list '=' id '[' id ']' ';' """
+        self.index(p[3])
         p[0] = ASTListGetVar(p[1], p[3], p[5])
 
     def p_code_while(self, p):
@@ -276,3 +308,16 @@ class CodeParser:
     def p_id_index(self, p):
         """id   : id '[' INTEGER ']'"""
         p[0] = IndexGetter(getter=p[1], index=p[3])
+
+
+# the PLY parser keeps the parsing state on itself, so every thread gets its own
+parsers = local()
+
+
+def local_parser(tokens, literals) -> CodeParser:
+    if not hasattr(parsers, "cache"):
+        parsers.cache = {}
+    key = (tuple(tokens), tuple(literals))
+    if key not in parsers.cache.keys():
+        parsers.cache[key] = CodeParser(tokens, literals)
+    return parsers.cache[key]
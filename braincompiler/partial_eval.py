@@ -0,0 +1,193 @@
+from bisect import bisect_right
+from typing import Dict, List, Union, Optional, Tuple, Set
+
+from .ast_iadd_int import ASTIaddInt
+from .code_buffer import CodeBuffer
+from .code_getters import IGetter, CellGetter, VarGetter
+from .code_stack import Stack, SCRATCH_SUFFIX
+from .code_types import StringCodeType
+from .code_var import CodeVar
+from .goto import Goto
+from .util import bf_add, bf_move, wrap
+
+
+class PartialEvaluator:
+    """Runs the top level statements of the code queue at compile time, up to the first one reading input.
+
+    Statements are run whole, so the residual code starts between two of them, where the stack is empty. The executed
+    prefix is replaced by the output it printed and by the initialization of the declared cells it left non-zero.
+    A statement exceeding the step budget stops the evaluation before it.
+    """
+
+    def __init__(self, code: List[Union[Goto, str]], declarations: Dict[str, CodeVar], boundaries: List[int],
+                 budget: int, stack: str = "__stack"):
+        self.code: List[Union[Goto, str]] = code
+        self.declarations: Dict[str, CodeVar] = declarations
+        self.boundaries: List[int] = boundaries
+        self.budget: int = budget
+        self.stack: str = stack
+
+        self.tape: bytearray = bytearray()
+        self.output: bytearray = bytearray()
+        self.pos: int = 0
+        self.ptr: int = 0
+        self.last: Optional[IGetter] = None
+
+    def process(self) -> List[Union[Goto, str]]:
+        size = max((i.var.get_var(self.declarations).pos for i in self.code if isinstance(i, Goto)), default=0)
+        self.tape = bytearray(size + 1)
+        start = 0
+        for end in self.boundaries:
+            if not self.step(start, end):
+                break
+            start = end
+        if start == 0:
+            return self.code
+        return self.residual(self.code[start:]) + self.code[start:]
+
+    def segment(self, start: int, end: int) -> Tuple[str, int, Optional[IGetter]]:
+        data: List[str] = []
+        pos = self.pos
+        last = self.last
+        for i in self.code[start:end]:
+            if isinstance(i, Goto):
+                var = i.var.get_var(self.declarations).pos
+                data.append(bf_move(var - pos))
+                pos = var
+                last = i.var
+                continue
+            data.append(i)
+        return "".join(data), pos, last
+
+    def step(self, start: int, end: int) -> bool:
+        code, pos, last = self.segment(start, end)
+        if "," in code:
+            return False
+        tape = bytearray(self.tape)
+        result = self.run(code, tape, self.ptr)
+        if result is None:
+            return False
+        self.ptr, output = result
+        if self.ptr != pos:
+            return False
+        self.tape = tape
+        self.output += output
+        self.pos = pos
+        self.last = last
+        return True
+
+    def run(self, code: str, tape: bytearray, ptr: int) -> Optional[Tuple[int, bytearray]]:
+        match: Dict[int, int] = {}
+        opened: List[int] = []
+        for n, i in enumerate(code):
+            if i == "[":
+                opened.append(n)
+            elif i == "]":
+                if len(opened) == 0:
+                    return None
+                match[n] = opened.pop()
+                match[match[n]] = n
+        if len(opened) != 0:
+            return None
+
+        output = bytearray()
+        pc = 0
+        while pc < len(code):
+            if self.budget <= 0 or not 0 <= ptr < len(tape):
+                return None
+            self.budget -= 1
+            match code[pc]:
+                case "+":
+                    tape[ptr] = (tape[ptr] + 1) & 255
+                case "-":
+                    tape[ptr] = (tape[ptr] - 1) & 255
+                case ">":
+                    ptr += 1
+                case "<":
+                    ptr -= 1
+                case "[" if tape[ptr] == 0:
+                    pc = match[pc]
+                case "]" if tape[ptr] != 0:
+                    pc = match[pc]
+                case ".":
+                    output.append(tape[ptr])
+            pc += 1
+        return ptr, output
+
+    def used(self, code: List[Union[Goto, str]]) -> Optional[Set[str]]:
+        """Declarations the residual code reaches, None if asm movements may reach any of them."""
+        units = sorted((var.pos, name) for name, var in self.declarations.items() if name != self.stack)
+        starts = [i[0] for i in units]
+        data: Set[str] = set()
+        pos = 0
+        area: Optional[Tuple[int, int]] = None
+        for i in code:
+            if isinstance(i, Goto):
+                pos = i.var.get_var(self.declarations).pos
+                name = units[bisect_right(starts, pos) - 1][1] if len(starts) != 0 and pos >= starts[0] else None
+                if name is not None and pos >= self.declarations[name].pos + self.declarations[name].get_size():
+                    name = None
+                if name is not None:
+                    data.add(name)
+                area = None if name is None else self.area(name)
+                continue
+            if "<" not in i and ">" not in i:
+                continue
+            # kernels only move inside the scratch cells and string tails, loops that shift the pointer may go anywhere
+            if area is None:
+                return None
+            opened: List[int] = []
+            for f in i:
+                if f == ">":
+                    pos += 1
+                elif f == "<":
+                    pos -= 1
+                elif f == "[":
+                    opened.append(pos)
+                elif f == "]" and (len(opened) == 0 or opened.pop() != pos):
+                    return None
+                if not area[0] <= pos < area[1]:
+                    return None
+            if len(opened) != 0:
+                return None
+        return data
+
+    def area(self, name: str) -> Optional[Tuple[int, int]]:
+        """Cells the movements starting in a declaration may reach, the same as for the layout optimizer."""
+        var = self.declarations[name]
+        if name == self.stack + SCRATCH_SUFFIX:
+            return var.pos, var.pos + var.get_size()
+        if isinstance(var.type, StringCodeType) and var.type.tail != 0:
+            return var.type.get_cell(var, var.type.len_).pos, var.pos + var.get_size()
+        return None
+
+    def getters(self, names: Optional[Set[str]]) -> Dict[int, IGetter]:
+        data: Dict[int, IGetter] = {}
+        for name, var in self.declarations.items():
+            if name == self.stack or names is not None and name not in names:
+                continue
+            if isinstance(var.type, StringCodeType):
+                for i in range(var.type.len_ + var.type.tail):
+                    data[var.type.get_cell(var, i).pos] = CellGetter(VarGetter(name), i)
+            else:
+                data[var.pos] = VarGetter(name)
+        return data
+
+    def residual(self, code: List[Union[Goto, str]]) -> List[Union[Goto, str]]:
+        stack = Stack(self.stack)
+        out = CodeBuffer(self.declarations, stack)
+        if len(self.output) != 0:
+            slot = stack.push()
+            out.write(Goto(slot))
+            last = 0
+            for i in self.output:
+                out.write(bf_add(wrap(i - last)) + ".")
+                last = i
+            out.write("[-]")
+            stack.pop(slot)
+        for pos, getter in self.getters(self.used(code)).items():
+            if pos < len(self.tape) and self.tape[pos] != 0:
+                out.write(ASTIaddInt([getter], self.tape[pos]))
+        if self.last is not None:
+            out.write(Goto(self.last))
+        return out.queue
@@ -1,46 +1,71 @@
-from typing import List, Dict
+from typing import Dict, Iterable, List
 
 from .lexer import CodeLexer
 
 
 class Preprocessor:
-    def __init__(self, code: List = None, declarations: Dict[str, List] = None):
-        self.code = code if code is not None else []
+    """Token stream between the lexer and the parser expanding #define macros.
+
+    Tokens are pulled lazily, a macro use pushes an iterator over its body onto the expansion stack, so the token
+    list is never copied. A macro used inside its own expansion is an error.
+    """
+
+    def __init__(self, code: Iterable = None, declarations: Dict[str, List] = None):
         self.declarations = declarations if declarations is not None else {}
 
-        self.token_pos = 0
-
-    def process(self):
-        pos = 0
-        while pos < len(self.code):
-            if self.code[pos].type == 'DEFINE':
-                line: int = self.code[pos].lineno
-                self.code.pop(pos)
-                if not pos < len(self.code) or not self.code[pos].type == "ID":
-                    raise Exception(f"{line}: missing ID after #define")
-                name: str = self.code[pos].value
-                if name in self.declarations.keys():
-                    raise Exception(f"{line}: {name} is exist")
-                self.code.pop(pos)
-                self.declarations[name] = []
-                while pos < len(self.code) and self.code[pos].lineno == line:
-                    self.declarations[name].append(self.code[pos])
-                    self.code.pop(pos)
-            elif self.code[pos].type == 'ID' and self.code[pos].value in self.declarations.keys():
-                name: str = self.code[pos].value
-                self.code.pop(pos)
-                self.code = self.code[:pos] + self.declarations[name] + self.code[pos:]
-            else:
-                pos += 1
+        # [macro name or None for the source, remaining tokens, token read past a #define line]
+        self.frames: List[list] = []
+        if code is not None:
+            self.frames.append([None, iter(code), None])
 
     def input(self, data: str):
         lexer = CodeLexer()
         lexer.lexer.input(data)
-        self.code = list(lexer.lexer)
-        self.process()
+        self.frames = [[None, iter(lexer.lexer), None]]
+
+    @staticmethod
+    def read(frame: list):
+        tok = frame[2]
+        if tok is None:
+            return next(frame[1], None)
+        frame[2] = None
+        return tok
+
+    def next(self):
+        while len(self.frames) != 0:
+            tok = self.read(self.frames[-1])
+            if tok is not None:
+                return tok
+            self.frames.pop()
+        return None
+
+    def define(self, line: int):
+        frame = self.frames[-1]
+        tok = self.read(frame)
+        if tok is None or not tok.type == "ID":
+            raise Exception(f"{line}: missing ID after #define")
+        if tok.value in self.declarations.keys():
+            raise Exception(f"{line}: {tok.value} is exist")
+        body = self.declarations[tok.value] = []
+        tok = self.read(frame)
+        while tok is not None and tok.lineno == line:
+            body.append(tok)
+            tok = self.read(frame)
+        frame[2] = tok
+
+    def expand(self, line: int, name: str):
+        if any(i[0] == name for i in self.frames):
+            raise Exception(f"{line}: recursive macro {name}")
+        self.frames.append([name, iter(self.declarations[name]), None])
 
     def token(self):
-        if not self.token_pos < len(self.code):
-            return None
-        self.token_pos += 1
-        return self.code[self.token_pos - 1]
+        while True:
+            tok = self.next()
+            if tok is None:
+                return None
+            if tok.type == 'DEFINE':
+                self.define(tok.lineno)
+            elif tok.type == 'ID' and tok.value in self.declarations.keys():
+                self.expand(tok.lineno, tok.value)
+            else:
+                return tok
@@ -0,0 +1,230 @@
+from array import array
+from typing import Dict, List, Iterable, Tuple, Union
+
+from .code_var import CodeVar
+from .goto import Goto
+
+ADD, MOVE, SET, MUL, JZ, JNZ, SCAN, OUT, IN = range(9)
+
+OP_NAMES = ("ADD", "MOVE", "SET", "MUL", "JZ", "JNZ", "SCAN", "OUT", "IN")
+
+
+class IRBuilder:
+    """Builds the flat runtime IR from a stream of brainfuck events.
+
+    Additions and moves are kept pending and emitted as offset-addressed ADDs plus one MOVE, balanced loops made of
+    additions only become SET/MUL, and loops made of a single move become SCAN.
+    """
+
+    def __init__(self):
+        self.ops: array = array("b")
+        self.arg_a: array = array("q")
+        self.arg_b: array = array("q")
+        self.mul_targets: List[Tuple[Tuple[int, int], ...]] = []
+
+        self.adds: Dict[int, int] = {}
+        self.shift: int = 0
+        self.loops: List[int] = []
+
+    def emit(self, op: int, a: int = 0, b: int = 0) -> None:
+        self.ops.append(op)
+        self.arg_a.append(a)
+        self.arg_b.append(b)
+
+    def flush_adds(self) -> None:
+        for off, num in self.adds.items():
+            num %= 256
+            if num == 0:
+                continue
+            if len(self.ops) != 0 and self.ops[-1] == SET and self.arg_a[-1] == off and self.arg_b[-1] == 0:
+                self.arg_b[-1] = num
+                continue
+            self.emit(ADD, off, num)
+        self.adds.clear()
+
+    def flush(self) -> None:
+        self.flush_adds()
+        if self.shift != 0:
+            self.emit(MOVE, self.shift)
+            self.shift = 0
+
+    def add(self, num: int) -> None:
+        self.adds[self.shift] = self.adds.get(self.shift, 0) + num
+
+    def move(self, num: int) -> None:
+        self.shift += num
+
+    def out(self) -> None:
+        num = self.adds.pop(self.shift, 0) % 256
+        if num != 0:
+            self.emit(ADD, self.shift, num)
+        self.emit(OUT, self.shift)
+
+    def inp(self) -> None:
+        self.adds.pop(self.shift, None)
+        self.emit(IN, self.shift)
+
+    def open(self) -> None:
+        self.flush()
+        self.loops.append(len(self.ops))
+        self.emit(JZ)
+
+    def close(self) -> None:
+        if len(self.loops) == 0:
+            raise Exception("Unbalanced ]")
+        start = self.loops.pop()
+        if start == len(self.ops) - 1:
+            if self.shift == 0 and self.adds.keys() <= {0} and self.adds.get(0, 0) % 2 == 1:
+                self.collapse(start, SET, 0)
+                return
+            if self.shift == 0 and self.adds.get(0, 0) in (-1, 1):
+                step = -self.adds.pop(0)
+                targets = tuple((off, num * step % 256) for off, num in self.adds.items() if num % 256 != 0)
+                self.adds.clear()
+                self.mul_targets.append(targets)
+                self.collapse(start, MUL, len(self.mul_targets) - 1)
+                return
+            if len(self.adds) == 0 and self.shift != 0:
+                step = self.shift
+                self.shift = 0
+                self.collapse(start, SCAN, step)
+                return
+        self.flush()
+        self.emit(JNZ, start)
+        self.arg_a[start] = len(self.ops) - 1
+
+    def collapse(self, start: int, op: int, a: int) -> None:
+        self.adds.clear()
+        self.ops[start] = op
+        self.arg_a[start] = a
+        self.arg_b[start] = 0
+
+    def feed(self, code: str) -> None:
+        i = 0
+        while i < len(code):
+            c = code[i]
+            if c in "+-":
+                j = i
+                num = 0
+                while j < len(code) and code[j] in "+-":
+                    num += 1 if code[j] == "+" else -1
+                    j += 1
+                self.add(num)
+                i = j
+                continue
+            if c in "<>":
+                j = i
+                num = 0
+                while j < len(code) and code[j] in "<>":
+                    num += 1 if code[j] == ">" else -1
+                    j += 1
+                self.move(num)
+                i = j
+                continue
+            match c:
+                case "[":
+                    self.open()
+                case "]":
+                    self.close()
+                case ".":
+                    self.out()
+                case ",":
+                    self.inp()
+            i += 1
+
+    def feed_queue(self, code: Iterable[Union[Goto, str]], declarations: Dict[str, CodeVar]) -> None:
+        pos = 0
+        for i in code:
+            if isinstance(i, Goto):
+                var = i.var.get_var(declarations).pos
+                self.move(var - pos)
+                pos = var
+                continue
+            if not isinstance(i, str):
+                raise Exception
+            self.feed(i)
+
+    def build(self) -> "CodeRuntime":
+        if len(self.loops) != 0:
+            raise Exception("Unbalanced [")
+        self.flush()
+        return CodeRuntime(self.ops, self.arg_a, self.arg_b, self.mul_targets)
+
+
+class CodeRuntime:
+    def __init__(self, ops: array, arg_a: array, arg_b: array, mul_targets: List[Tuple[Tuple[int, int], ...]]):
+        self.ops: List[int] = ops.tolist()
+        self.arg_a: List[int] = arg_a.tolist()
+        self.arg_b: List[int] = arg_b.tolist()
+        self.mul_targets: List[Tuple[Tuple[int, int], ...]] = mul_targets
+
+    @classmethod
+    def from_code(cls, code: Iterable[str]) -> "CodeRuntime":
+        builder = IRBuilder()
+        if isinstance(code, str):
+            code = [code]
+        for i in code:
+            builder.feed(i)
+        return builder.build()
+
+    @classmethod
+    def from_queue(cls, code: Iterable[Union[Goto, str]], declarations: Dict[str, CodeVar]) -> "CodeRuntime":
+        builder = IRBuilder()
+        builder.feed_queue(code, declarations)
+        return builder.build()
+
+    def __str__(self):
+        return "\n".join(
+            f"{n}: {OP_NAMES[op]} {a} {b}" if op != MUL else f"{n}: MUL {self.mul_targets[a]}"
+            for n, (op, a, b) in enumerate(zip(self.ops, self.arg_a, self.arg_b))
+        )
+
+    def run(self, inp: Iterable[int] = b"", mem_len: int = 30000) -> bytearray:
+        ops, arg_a, arg_b, mul_targets = self.ops, self.arg_a, self.arg_b, self.mul_targets
+        inp = iter(inp)
+        out = bytearray()
+        mem = bytearray(mem_len)
+        size = len(ops)
+        p = 0
+        pc = 0
+        while pc < size:
+            op = ops[pc]
+            if op == ADD:
+                i = p + arg_a[pc]
+                mem[i] = (mem[i] + arg_b[pc]) & 255
+            elif op == MOVE:
+                p += arg_a[pc]
+            elif op == JNZ:
+                if mem[p]:
+                    pc = arg_a[pc]
+            elif op == JZ:
+                if not mem[p]:
+                    pc = arg_a[pc]
+            elif op == SET:
+                mem[p + arg_a[pc]] = arg_b[pc]
+            elif op == MUL:
+                var = mem[p]
+                if var:
+                    for off, num in mul_targets[arg_a[pc]]:
+                        i = p + off
+                        mem[i] = (mem[i] + var * num) & 255
+                    mem[p] = 0
+            elif op == SCAN:
+                step = arg_a[pc]
+                if step == 1:
+                    p = mem.index(0, p)
+                elif step == -1:
+                    p = mem.rindex(0, 0, p + 1)
+                else:
+                    while mem[p]:
+                        p += step
+            elif op == OUT:
+                out.append(mem[p + arg_a[pc]])
+            elif op == IN:
+                mem[p + arg_a[pc]] = next(inp, 0)
+            pc += 1
+        return out
+
+
+def run_code(code: str, inp: Iterable[int] = b"", mem_len: int = 30000) -> bytearray:
+    return CodeRuntime.from_code(code).run(inp, mem_len)
@@ -0,0 +1,54 @@
+import hashlib
+import importlib.util
+import os
+from types import ModuleType
+from typing import Optional
+
+from ply import __version__ as ply_version
+
+
+def cache_dir() -> str:
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(root, "braincompiler")
+
+
+def grammar_hash(*parts) -> str:
+    """Hashes everything PLY builds its tables from: token lists, rule strings and rule docstrings."""
+    data = hashlib.sha256(ply_version.encode())
+    for i in parts:
+        data.update(repr(i).encode())
+    return data.hexdigest()[:16]
+
+
+def rules(obj, prefix: str) -> list:
+    return [
+        (name, getattr(obj, name).__doc__ if callable(getattr(obj, name)) else getattr(obj, name))
+        for name in sorted(dir(obj)) if name.startswith(prefix)
+    ]
+
+
+def table_name(kind: str, digest: str) -> str:
+    return f"{kind}_{digest}"
+
+
+def load_table(name: str) -> Optional[ModuleType]:
+    """Loads a table module written to the cache dir by an earlier run, the name already carries the grammar hash."""
+    path = os.path.join(cache_dir(), name + ".py")
+    if not os.path.exists(path):
+        return None
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        return None
+    return module
+
+
+def output_dir() -> str:
+    path = cache_dir()
+    try:
+        os.makedirs(path, exist_ok=True)
+    except OSError:
+        pass
+    return path
@@ -1,3 +1,13 @@
+from functools import lru_cache
+from typing import Optional, Tuple
+
+# estimated distance between a constant temporary and its targets, when their cells are not known
+CONST_DISTANCE = 2
+# weight of an executed instruction against an emitted one when choosing constant code
+CONST_STEP_WEIGHT = 0.25
+
+
+@lru_cache(maxsize=1024)
 def bf_add(num: int) -> str:
     if num > 0:
         return "+" * num
@@ -7,6 +17,7 @@ def bf_add(num: int) -> str:
         return "-" * -num
 
 
+@lru_cache(maxsize=1024)
 def bf_move(num: int) -> str:
     if num > 0:
         return ">" * num
@@ -14,3 +25,47 @@ def bf_move(num: int) -> str:
         return ""
     if num < 0:
         return "<" * -num
+
+
+def wrap(num: int) -> int:
+    num %= 256
+    return num - 256 if num > 128 else num
+
+
+def const_plain_cost(num: int, targets: int = 1) -> float:
+    return (1 + CONST_STEP_WEIGHT) * targets * abs(wrap(num))
+
+
+def const_loop_cost(loops: int, step: int, rest: int, targets: int = 1, trip: Optional[int] = None) -> float:
+    """trip - cells the pointer moves in one round from the temporary over the targets and back."""
+    moves = 2 * CONST_DISTANCE * targets if trip is None else trip
+    length = 3 + loops + 3 + targets * abs(step) + moves + targets * abs(rest)
+    steps = 1 + loops + loops * (2 + targets * abs(step) + moves) + targets * abs(rest)
+    return length + CONST_STEP_WEIGHT * steps
+
+
+@lru_cache(maxsize=None)
+def bf_const(num: int, targets: int = 1, trip: Optional[int] = None) -> Optional[Tuple[int, int, int]]:
+    """Cheapest multiplier loop adding num to targets cells as (loops, step, rest), None if plain additions win."""
+    best = const_plain_cost(num, targets)
+    result = None
+    for loops in range(2, 17):
+        # the remainder costs more than the step per unit, so only steps closest to num / loops are worth trying
+        for target in (num % 256, num % 256 - 256):
+            for step in (target // loops, -(-target // loops)):
+                if abs(step) < 2:
+                    continue
+                rest = wrap(num - loops * step)
+                cost = const_loop_cost(loops, step, rest, targets, trip)
+                if cost < best:
+                    best = cost
+                    result = loops, step, rest
+    return result
+
+
+def const_cost(num: int, targets: int = 1) -> float:
+    """Estimated cost of adding num to targets cells the way bf_const chooses."""
+    const = bf_const(num % 256, targets)
+    if const is None:
+        return const_plain_cost(num, targets)
+    return const_loop_cost(*const, targets)
@@ -0,0 +1,169 @@
+import re
+from typing import Dict, List, Union, Optional, Set, Tuple
+
+from .code_var import CodeVar
+from .goto import Goto
+from .util import bf_add, wrap
+
+TOKEN = re.compile(r"\[-\]|[+-]+|.", re.DOTALL)
+
+Op = Tuple[str, int, Union[Goto, str]]
+Summary = Tuple[Optional[Set[int]], Dict[int, int]]
+
+
+class ValueTracker:
+    """Abstract interpretation of the code queue tracking cells with statically known values.
+
+    Clears of known cells become delta updates (or disappear) and loops on known zero cells are dropped.
+    """
+
+    def __init__(self, code: List[Union[Goto, str]], declarations: Dict[str, CodeVar]):
+        self.code: List[Union[Goto, str]] = code
+        self.declarations: Dict[str, CodeVar] = declarations
+
+        self.match: Dict[int, int] = {}
+        self.summaries: Dict[int, Summary] = {}
+
+    def process(self) -> List[Union[Goto, str]]:
+        ops = self.parse()
+        if ops is None or not self.summarize(ops):
+            return self.code
+        return self.rewrite(ops)
+
+    def parse(self) -> Optional[List[Op]]:
+        ops: List[Op] = []
+        for i in self.code:
+            if isinstance(i, Goto):
+                ops.append(("goto", i.var.get_var(self.declarations).pos, i))
+                continue
+            if not isinstance(i, str):
+                raise Exception
+            if "<" in i or ">" in i:
+                depth = 0
+                for f in i:
+                    depth += (f == "[") - (f == "]")
+                    if depth < 0:
+                        return None
+                if depth != 0:
+                    return None
+                ops.append(("opaque", 0, i))
+                continue
+            for token in TOKEN.finditer(i):
+                token = token.group()
+                match token[0]:
+                    case "[" if token == "[-]":
+                        ops.append(("clear", 0, token))
+                    case "+" | "-":
+                        ops.append(("add", token.count("+") - token.count("-"), token))
+                    case "[":
+                        ops.append(("open", 0, token))
+                    case "]":
+                        ops.append(("close", 0, token))
+                    case ",":
+                        ops.append(("in", 0, token))
+                    case _:
+                        ops.append(("other", 0, token))
+        return ops
+
+    @staticmethod
+    def loop_head(state: Dict[int, int], summary: Summary) -> Dict[int, int]:
+        modified, exit_state = summary
+        if modified is None:
+            head = {}
+        else:
+            head = {c: v for c, v in state.items() if c not in modified}
+        for c, v in exit_state.items():
+            if state.get(c) == v:
+                head[c] = v
+        return head
+
+    def summarize(self, ops: List[Op]) -> bool:
+        # frame: open index, pointer at open, known values, modified cells (None - everything)
+        frames: List[list] = [[-1, 0, {}, set()]]
+        pos = 0
+        for n, (kind, arg, _) in enumerate(ops):
+            frame = frames[-1]
+            state: Dict[int, int] = frame[2]
+            modified: Optional[Set[int]] = frame[3]
+            match kind:
+                case "goto":
+                    pos = arg
+                case "add":
+                    if pos in state:
+                        state[pos] = (state[pos] + arg) % 256
+                    if modified is not None:
+                        modified.add(pos)
+                case "clear":
+                    state[pos] = 0
+                    if modified is not None:
+                        modified.add(pos)
+                case "open":
+                    frames.append([n, pos, {}, set()])
+                case "close":
+                    if len(frames) == 1:
+                        return False
+                    start, start_pos, body_state, body_modified = frames.pop()
+                    if start_pos != pos:
+                        return False
+                    self.match[start] = n
+                    self.summaries[start] = (body_modified, body_state)
+                    frame = frames[-1]
+                    frame[2] = self.loop_head(frame[2], self.summaries[start])
+                    frame[2][pos] = 0
+                    if frame[3] is not None:
+                        frame[3] = None if body_modified is None else frame[3] | body_modified
+                case "in":
+                    state.pop(pos, None)
+                    if modified is not None:
+                        modified.add(pos)
+                case "opaque":
+                    state.clear()
+                    frame[3] = None
+        return len(frames) == 1
+
+    def rewrite(self, ops: List[Op]) -> List[Union[Goto, str]]:
+        out: List[Union[Goto, str]] = []
+        heads: List[Dict[int, int]] = []
+        # the tape starts zeroed
+        state: Dict[int, int] = {arg: 0 for kind, arg, _ in ops if kind == "goto"}
+        pos = 0
+        n = 0
+        while n < len(ops):
+            kind, arg, item = ops[n]
+            n += 1
+            match kind:
+                case "goto":
+                    pos = arg
+                    out.append(item)
+                case "add":
+                    if pos in state:
+                        state[pos] = (state[pos] + arg) % 256
+                    if wrap(arg) != 0:
+                        out.append(bf_add(wrap(arg)))
+                case "clear":
+                    if pos not in state:
+                        out.append(item)
+                    elif state[pos] != 0:
+                        out.append(bf_add(wrap(-state[pos])))
+                    state[pos] = 0
+                case "open":
+                    if state.get(pos) == 0:
+                        n = self.match[n - 1] + 1
+                        continue
+                    head = self.loop_head(state, self.summaries[n - 1])
+                    heads.append(head)
+                    state = dict(head)
+                    out.append(item)
+                case "close":
+                    state = heads.pop()
+                    state[pos] = 0
+                    out.append(item)
+                case "in":
+                    state.pop(pos, None)
+                    out.append(item)
+                case "opaque":
+                    state.clear()
+                    out.append(item)
+                case _:
+                    out.append(item)
+        return out
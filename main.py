@@ -1,27 +1,86 @@
+import contextlib
+import os
 import sys
+import tempfile
 from argparse import ArgumentParser
 from pathlib import PurePosixPath
-from typing import List
+from typing import List, Iterable, TextIO
 
-from braincompiler import compile_code
+from braincompiler import create_linker
+
+
+def write_lines(chunks: Iterable[str], f: TextIO, width: int = 100) -> None:
+    if width <= 0:
+        for chunk in chunks:
+            f.write(chunk)
+        return
+
+    column = 0
+    for chunk in chunks:
+        pos = 0
+        while pos < len(chunk):
+            part = chunk[pos:pos + width - column]
+            f.write(part)
+            pos += len(part)
+            column += len(part)
+            if column == width:
+                f.write("\n")
+                column = 0
+    if column != 0:
+        f.write("\n")
+
+
+def umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
 
 
 def main(args: List[str]):
     arg_parser = ArgumentParser(description="Compile simple language in brainfuck")
     arg_parser.add_argument('file', type=str, help='Input file')
-    arg_parser.add_argument('-o', type=str, default=None, help='output file')
+    arg_parser.add_argument('-o', type=str, default=None, help='output file, "-" for stdout')
+    arg_parser.add_argument('-w', '--width', type=int, default=100, help='output line width')
+    arg_parser.add_argument('--target', type=str, default='bf', choices=['bf', 'c'], help='output language')
+    arg_parser.add_argument('--no-wrap', action='store_const', const=0, dest='width', help='do not wrap output')
+    arg_parser.add_argument('-O', type=int, default=0, dest='optimize', help='optimization level')
+    arg_parser.add_argument('--map', type=str, default=None, help='write the memory layout to file')
+    arg_parser.add_argument('--evaluate', type=int, default=0, metavar='STEPS',
+                            help='run the code before the first input at compile time, within a step budget')
     names = arg_parser.parse_args(args[1:])
 
     with open(names.file) as f:
-        data: str = compile_code(f.read())
+        linker = create_linker(f.read(), optimize=names.optimize, target=names.target, evaluate=names.evaluate)
+    chunks = linker.iter_chunks()
 
     output = names.o
     if output is None:
-        output = PurePosixPath(names.file).stem + ".bf"
+        output = PurePosixPath(names.file).stem + "." + names.target
+    if names.target != "bf":
+        names.width = 0
+
+    if output == "-":
+        write_lines(chunks, sys.stdout, names.width)
+        sys.stdout.flush()
+    else:
+        # the code is lowered while it is written, so the output is replaced only once all of it is written
+        fd, temp = tempfile.mkstemp(suffix=".tmp", prefix=os.path.basename(output) + ".",
+                                    dir=os.path.dirname(os.path.abspath(output)))
+        try:
+            with os.fdopen(fd, "w") as f:
+                write_lines(chunks, f, names.width)
+            # mkstemp makes the file private, give it the mode open() would
+            os.chmod(temp, 0o666 & ~umask())
+            os.replace(temp, output)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temp)
+            raise
 
-    with open(output, "w") as f:
-        for i in range(0, len(data), 100):
-            f.write(data[i:i + 100] + "\n")
+    if names.map is not None:
+        with open(names.map, "w") as f:
+            for name, pos in sorted(linker.layout.items(), key=lambda i: i[1]):
+                f.write(f"{pos} {name}\n")
 
 
 if __name__ == '__main__':
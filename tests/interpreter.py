@@ -237,3 +237,36 @@ class Interpreter(Thread):
             raise TimeoutError
         self.state.stopped = True
         return self.out
+
+
+def count_steps(code: str, mem_len: int = 1000) -> int:
+    """Instructions executed by the code without input, counting every bracket passed."""
+    match: Dict[int, int] = {}
+    brackets: List[int] = []
+    for n, i in enumerate(code):
+        if i == "[":
+            brackets.append(n)
+        elif i == "]":
+            match[brackets[-1]] = n
+            match[n] = brackets.pop()
+    mem = bytearray(mem_len)
+    pos = 0
+    n = 0
+    steps = 0
+    while n < len(code):
+        steps += 1
+        match code[n]:
+            case "+":
+                mem[pos] = (mem[pos] + 1) % 256
+            case "-":
+                mem[pos] = (mem[pos] - 1) % 256
+            case ">":
+                pos += 1
+            case "<":
+                pos -= 1
+            case "[" if mem[pos] == 0:
+                n = match[n]
+            case "]" if mem[pos] != 0:
+                n = match[n]
+        n += 1
+    return steps
@@ -1,8 +1,19 @@
+import contextlib
+import io
+import itertools
+import os
 import random
+import shutil
+import subprocess
+import tempfile
+from functools import partial
 from operator import eq
-from unittest import TestCase
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
 
-from tests.interpreter import Interpreter
+from braincompiler.jit import CodeJit
+from braincompiler.runtime import CodeRuntime, run_code, SET, MOVE, MUL, SCAN
+from tests.interpreter import Interpreter, count_steps
 
 
 class Tests(TestCase):
@@ -130,6 +141,22 @@ class Tests(TestCase):
         self.assertEqual((left1 * right1) % 256, out[0])
         self.assertEqual((left2 * right2) % 256, out[1])
 
+    def test_mul_var(self):
+        left = random.randint(0, 255)
+        right = random.randint(0, 255)
+        code = f"""
+            int a = {left};
+            int b = {right};
+            int c = {left};
+            a *= b;
+            c *= c;
+            out a;
+            out b;
+            out c;
+        """
+        out = Interpreter()(self.compile_code(code), b"")
+        self.assertEqual(bytes([left * right % 256, right, left * left % 256]), out)
+
     def test_div_int(self):
         inp = b""
         left1 = random.randint(0, 255)
@@ -283,6 +310,145 @@ class Tests(TestCase):
         self.assertEqual(right1, out[0])
         self.assertEqual(right2, out[1])
 
+    def test_divmod(self):
+        left = random.randint(0, 255)
+        right = random.randint(1, 255)
+        code = f"""
+            int a = {left};
+            int b = {right};
+            int c;
+            int q;
+            int r;
+            q, r = a divmod b;
+            out q;
+            out r;
+            q, r = a divmod {right};
+            out q;
+            out r;
+            a, r = a divmod c;
+            out a;
+            out r;
+        """
+        out = Interpreter()(self.compile_code(code), b"")
+        self.assertEqual(bytes([left // right, left % right] * 2 + [255, 255]), out)
+
+    def test_divmod_name(self):
+        code = """
+            int divmod = 3;
+            int a = 17;
+            int q;
+            int r;
+            q, r = a divmod divmod;
+            out q;
+            out r;
+            out divmod;
+        """
+        out = Interpreter()(self.compile_code(code), b"")
+        self.assertEqual(bytes([5, 2, 3]), out)
+        self.assertRaises(Exception, self.compile_code, "int a; int b; int c; b, c = a mod a;")
+
+    def test_shift_int(self):
+        left = random.randint(0, 255)
+        code = f"""
+            int a = {left};
+            int b = {left};
+            int c = {left};
+            a >>= 3;
+            b >>= 9;
+            c <<= 2;
+            out a;
+            out b;
+            out c;
+        """
+        out = Interpreter()(self.compile_code(code), b"")
+        self.assertEqual(bytes([left >> 3, 0, (left << 2) % 256]), out)
+
+    def test_shift_var(self):
+        left = random.randint(0, 255)
+        right = random.randint(0, 7)
+        code = f"""
+            int a = {left};
+            int b = {left};
+            int c = {right};
+            int d = 9;
+            a <<= c;
+            b >>= c;
+            out a;
+            out b;
+            a = {left};
+            a <<= d;
+            b = {left};
+            b >>= d;
+            out a;
+            out b;
+        """
+        out = Interpreter()(self.compile_code(code), b"")
+        self.assertEqual(bytes([(left << right) % 256, left >> right, 0, 0]), out)
+
+    def test_shift_var_targets(self):
+        # the count is one of the targets, every target is shifted by its value before the shift
+        code = """
+            int a;
+            int b;
+            int c;
+            int d;
+            in a;
+            in b;
+            c = a;
+            d = 56;
+            a, b <<= a;
+            c, d >>= c;
+            out a;
+            out b;
+            out c;
+            out d;
+        """
+        out = Interpreter()(self.compile_code(code), b"\x03\x07")
+        self.assertEqual(bytes([24, 56, 0, 7]), out)
+
+    def test_case(self):
+        inp = bytes([0, 1, 2, 3, 7, 200, 255])
+        code = f"""
+            int a;
+            int b;
+            int counter = {len(inp)};
+            while (counter) {{
+                counter -= 1;
+                in a;
+                b = 100;
+                case (a) {{
+                    7: {{ b = 70; }}
+                    0, 2: {{ b = 20; }}
+                    255: {{ b = 250; }}
+                    3: {{ b = 30; a = 0; }}
+                }}
+                out b;
+            }}
+        """
+        out = Interpreter()(self.compile_code(code), inp)
+        self.assertEqual(bytes([20, 100, 20, 30, 70, 100, 250]), out)
+
+    def test_if_liveness(self):
+        from braincompiler import CodeLexer, CodeParser, Preprocessor
+        code = """
+            int a;
+            int b;
+            int c;
+            in a;
+            in b;
+            if (a) { c = 1; } else { c = 2; }
+            out c;
+            if (b) { out b; }
+            a = b;
+            out a;
+        """
+        for inp, result in ((b"\x00\x00", b"\x02\x00"), (b"\x03\x02", b"\x01\x02\x02")):
+            self.assertEqual(result, Interpreter()(self.compile_code(code), inp))
+        parser = CodeParser(CodeLexer.tokens, CodeLexer.literals)
+        file = parser.parse(input=code, lexer=Preprocessor())
+        file.process()
+        self.assertEqual([{0}, False], [i.consume for i in file.code if hasattr(i, "consume")])
+
     def test_div_var(self):
         inp = b""
         left1 = random.randint(0, 255)
@@ -390,7 +556,7 @@ class Tests(TestCase):
             in var;
             data[counter] = var;
             var = " ";
-            
+
             counter = 32;
             while (counter){
                 counter -= 1;
@@ -398,7 +564,7 @@ class Tests(TestCase):
                 var = data[var];
                 out var;
             }
-            
+
         """
         print(code)
         print(repr(inp))
@@ -466,3 +632,557 @@ class Tests(TestCase):
         print(out)
         self.assertEqual((left1 + right1 + 1) % 256, out[0])
         self.assertEqual((left2 + right2 + 1) % 256, out[1])
+
+    def test_deep_nesting(self):
+        import sys
+        depth = sys.getrecursionlimit() + 200
+        code = "int a = 1; int b = 5;\n" + "while (a) {\n" * depth + "a -= 1; b += 2;\n" + "}\n" * depth + "out b;"
+        self.assertEqual(b"\x07", run_code(self.compile_code(code)))
+
+    def test_lowering_cache(self):
+        from braincompiler import create_linker
+        code = "int a = 200; int b = 90; int i = 1; string s = \"abcdef\";\n" + \
+               "a /= 3; b /= 3; a += b; s[i] = a; i = s[0];\n" * 20 + "out a; out b; out i;"
+        a, b = 200, 90
+        for _ in range(20):
+            a, b = a // 3, b // 3
+            a = (a + b) % 256
+        linker = create_linker(code)
+        self.assertEqual(bytes([a, b, ord("a")]), Interpreter()(linker.process(), b""))
+        self.assertGreater(linker.code.cache.hits, linker.code.cache.misses)
+
+        # the same operation on other vars hits, at every optimization level
+        for optimize in range(4):
+            linker = create_linker("int a = 2; int b = 3; int c = 4; int d = 5;\n" +
+                                   "a *= 7; b *= 7; c *= 7; d *= 7; out a; out b; out c; out d;", optimize=optimize)
+            self.assertEqual(bytes([14, 21, 28, 35]), Interpreter()(linker.process(), b""))
+            self.assertGreater(linker.code.cache.hits, 0)
+
+        # a var far from the stack gets other constant code, the cached one is not replayed for it
+        code = f"int a; string t = \"{'y' * 100}\"; int b; a += 100; b += 100; out a; out b;"
+        out = create_linker(code).process()
+        self.assertEqual(bytes([100, 100]), Interpreter()(out, b""))
+        self.assertEqual(1, out.count("+" * 100))
+
+    def test_define_nested(self):
+        code = """
+            #define one 1
+            #define two one + one
+            int a = two;
+            #define four two + two
+            a += four + X;
+            out a;
+        """ + "a += two;\n" * 1000 + "out a;\n"
+        out = Interpreter()(self.compile_code(code, {"X": "one"}), b"")
+        self.assertEqual(bytes([7, (7 + 2000) % 256]), out)
+        self.assertRaises(Exception, self.compile_code, "#define a b\n#define b a + 1\nint c = a;")
+        self.assertRaises(Exception, self.compile_code, "#define a 1\n#define a 2\n")
+
+    def test_constants(self):
+        code = """
+            int a = 200;
+            int b = 100;
+            a -= 70;
+            b += 72;
+            out a;
+            out b;
+        """
+        out = Interpreter()(self.compile_code(code), b"")
+        self.assertEqual(bytes([130, 172]), out)
+        self.assertLess(len(self.compile_code(code)), 200)
+
+    def test_constants_far_stack(self):
+        # the string puts the stack far away from the vars, a multiplier loop there costs more than it saves
+        code = "int a; int b; int c; string s = \"" + "\\x00" * 100 + "\";\n" + \
+               "a = 65; b = 120; c = 200; out a; out b; out c;"
+        compiled = self.compile_code(code)
+        self.assertEqual(b"Ax\xc8", Interpreter()(compiled, b""))
+        self.assertLess(len(compiled), 1000)
+        self.assertLess(count_steps(compiled), 1000)
+
+    def test_set_int_repeated(self):
+        out = Interpreter()(self.compile_code("int a; int b; a, b, a = 5; out a; out b;"), b"")
+        self.assertEqual(b"\x05\x05", out)
+
+    def test_list_tail(self):
+        # only strings indexed by a var reserve the tail, asm stepping past other strings finds the next var
+        code = "string s = \"ab\"; int x = 5; {} goto s; asm(\">>.\");"
+        self.assertEqual(b"\x05", Interpreter()(self.compile_code(code.format("")), b""))
+        indexed = code.format("int i; x = s[i];")
+        self.assertEqual(b"\x00", Interpreter()(self.compile_code(indexed), b""))
+
+    def test_list_code_size(self):
+        table = bytes(random.randint(0, 255) for _ in range(256))
+        index = random.randint(0, 255)
+        escaped = "".join(f"\\x{i:02x}" for i in table)
+        declarations = f"""
+            string data = "{escaped}";
+            int i;
+            int var;
+            in i;
+        """
+        access = """
+            var = data[i];
+            out var;
+            data[i] = i;
+        """
+        code = declarations + access + access
+        out = Interpreter()(self.compile_code(code), bytes([index]))
+        self.assertEqual(bytes([table[index], index]), out)
+        size = len(self.compile_code(code)) - len(self.compile_code(declarations + access))
+        self.assertLess(size, 1000)
+
+    def test_list_out_of_range(self):
+        code = """
+            int a = 7;
+            string s = "abc";
+            int b = 9;
+            int i;
+            int var = 42;
+            in i;
+            var = s[i];
+            s[i] = a;
+            out var; out a; out s[0]; out s[1]; out s[2]; out b;
+        """
+        for index in (3, 4, 200, 255):
+            out = Interpreter()(self.compile_code(code), bytes([index]))
+            self.assertEqual(b"*\x07abc\x09", out)
+        out = Interpreter()(self.compile_code(code), b"\x02")
+        self.assertEqual(b"c\x07ab\x07\x09", out)
+        self.assertRaises(Exception, self.compile_code, "string s = \"ab\"; out s[3];")
+        self.assertRaises(Exception, self.compile_code, "string s = \"ab\"; int a; a = s[2];")
+
+    def test_list_long(self):
+        table = bytes(random.randint(0, 255) for _ in range(300))
+        escaped = "".join(f"\\x{i:02x}" for i in table)
+        code = f"""
+            string data = "{escaped}";
+            int i;
+            int var;
+            in i;
+            var = data[i];
+            out var;
+            data[i] = i;
+            out data[5];
+        """
+        out = Interpreter()(self.compile_code(code), b"\x05")
+        self.assertEqual(bytes([table[5], 5]), out)
+
+    def test_string_init(self):
+        text = "Hello, World! Some text to print."
+        code = f"""
+            string data = "{text}";
+            int i;
+            int n = {len(text)};
+            int c;
+            while (n) {{
+                c = data[i];
+                out c;
+                i += 1;
+                n -= 1;
+            }}
+        """
+        out = Interpreter()(self.compile_code(code), b"")
+        self.assertEqual(text.encode(), out)
+        self.assertLess(len(self.compile_code(f'string data = "{text}";')), sum(text.encode()))
+
+    def test_evaluate(self):
+        code = """
+            string text = "Value: ";
+            int i;
+            int n = 7;
+            int c;
+            int a = 123;
+            while (n) {
+                c = text[i];
+                out c;
+                i += 1;
+                n -= 1;
+            }
+            a /= 10;
+            a += 48;
+            out a;
+            in c;
+            out c;
+            out a;
+        """
+        evaluated = self.compile_code(code, evaluate=100000)
+        self.assertEqual(b"Value: <x<", Interpreter()(evaluated, b"x"))
+        self.assertLess(len(evaluated), len(self.compile_code(code)))
+        self.assertEqual(self.compile_code(code), self.compile_code(code, evaluate=10))
+
+    def test_evaluate_asm(self):
+        # the asm steps past the string, the vars it reaches keep their values in the residual
+        code = "string s = \"a\"; int x = 5; int y = 7; int c; in c; goto s; asm(\"{0}.{1}\");"
+        for n, value in ((1, b"\x05"), (2, b"\x07")):
+            evaluated = self.compile_code(code.format(">" * n, "<" * n), evaluate=100000)
+            self.assertEqual(value, Interpreter()(evaluated, b"\x01"))
+
+    def test_clear_loop(self):
+        # the addition after the clear loop is on the same cell, it must stay after the clear in any order of cells
+        code = "asm(\">>>>>>>>>>.<<<<<<[+]+++<<+.>>.\");"
+        self.assertEqual(b"\x00\x01\x03", Interpreter()(self.compile_code(code), b""))
+
+    def test_chunks(self):
+        from braincompiler import CodeLinker, CodeLexer, CodeParser, Preprocessor
+        code = f"""
+            string data = "{"a" * 64}";
+            int i = 3;
+            int var;
+            var = data[i];
+            out var;
+        """
+        parser = CodeParser(CodeLexer.tokens, CodeLexer.literals)
+        chunks = list(CodeLinker(parser.parse(input=code, lexer=Preprocessor()), chunk_size=256).iter_chunks())
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(Tests.compile_code(code), "".join(chunks))
+
+    def test_tables(self):
+        import braincompiler
+        from braincompiler import CodeLexer, CodeParser
+        from braincompiler.tables import cache_dir
+        with tempfile.TemporaryDirectory() as cache:
+            environ = os.environ.get("XDG_CACHE_HOME")
+            os.environ["XDG_CACHE_HOME"] = cache
+            try:
+                with patch.object(CodeLexer, "master", None):
+                    lexer = CodeLexer()
+                    parser = CodeParser(CodeLexer.tokens, CodeLexer.literals)
+                    self.assertEqual(2, len(os.listdir(cache_dir())))
+                    self.assertIsNot(lexer.lexer, CodeLexer().lexer)
+                    self.assertEqual(parser.parser.action,
+                                     CodeParser(CodeLexer.tokens, CodeLexer.literals).parser.action)
+            finally:
+                if environ is None:
+                    del os.environ["XDG_CACHE_HOME"]
+                else:
+                    os.environ["XDG_CACHE_HOME"] = environ
+        package = os.path.dirname(braincompiler.__file__)
+        self.assertFalse(os.path.exists(os.path.join(package, "parser.out")))
+        code = "int a = 2; out a;"
+        self.assertEqual(self.compile_code(code), self.compile_code(code))
+
+    def test_syntax_error(self):
+        code = "int a = 2; out a;"
+        expected = self.compile_code(code)
+        self.assertRaises(Exception, self.compile_code, "int a = 2; out a")
+        self.assertEqual(expected, self.compile_code(code))
+
+    def test_exports(self):
+        import braincompiler
+        for name in ("ASTFile", "ASTWhile", "Goto", "IndexGetter", "VarGetter", "CodeBuffer", "Stack"):
+            self.assertIn(name, braincompiler.__all__)
+        self.assertEqual([], [i for i in braincompiler.__all__ if not hasattr(braincompiler, i)])
+
+    def test_compiler(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from braincompiler import Compiler
+        compiler = Compiler()
+        sources = [f"int a = {i}; string b = \"{'x' * (i % 5)}\"; a += X; out a;" for i in range(64)]
+        expected = [Tests.compile_code(i, {"X": str(n % 3)}) for n, i in enumerate(sources)]
+        pairs = [(i, {"X": str(n % 3)}) for n, i in enumerate(sources)]
+        self.assertEqual(expected, list(compiler.compile_many(pairs)))
+        with ThreadPoolExecutor(8) as executor:
+            self.assertEqual(expected, list(executor.map(lambda i: compiler.compile(*i), pairs)))
+        for n, i in enumerate(expected):
+            self.assertEqual(bytes([(n + n % 3) % 256]), Interpreter()(i, b""))
+        self.assertRaises(Exception, Compiler, target="js")
+
+
+class OptimizedTests(Tests):
+    from braincompiler import compile_code
+    compile_code = staticmethod(partial(compile_code, optimize=1))
+
+    def test_peephole(self):
+        from braincompiler import CodeOptimizer
+        self.assertEqual(">.", CodeOptimizer([">><+-<>.", "[-][-]"]).process())
+        self.assertEqual("<-.[->+<]", CodeOptimizer(["+[-]", "[-]+-<-.", "[->+<]"]).process())
+        self.assertEqual("-[-<+>]", CodeOptimizer(["+" * 255, "[-<+>][-]", "[-]", "[>]"]).process())
+        self.assertEqual(",[-]", CodeOptimizer([",+++", "[-][+", "+>]"]).process())
+
+
+class TrackedTests(Tests):
+    from braincompiler import compile_code
+    compile_code = staticmethod(partial(compile_code, optimize=2))
+
+    def test_known_values(self):
+        code = """
+            int a = 5;
+            int b;
+            b = a;
+            b += 1;
+            out b;
+        """
+        out = Interpreter()(self.compile_code(code), b"")
+        self.assertEqual(b"\x06", out)
+        self.assertLess(len(self.compile_code(code)), len(Tests.compile_code(code, optimize=1)))
+
+
+class ScheduledTests(Tests):
+    from braincompiler import compile_code
+    compile_code = staticmethod(partial(compile_code, optimize=3))
+
+    def test_travel(self):
+        code = """
+            int a;
+            string s = "                ";
+            int b;
+            int c;
+            in a;
+            a += 1;
+            b += 1;
+            c += 1;
+            s[3] = c;
+            a += 1;
+            b = a;
+            out b;
+        """
+        travel = [sum(map(i.count, "<>")) for i in (Tests.compile_code(code, optimize=2), self.compile_code(code))]
+        self.assertLess(travel[1], travel[0])
+
+    def test_layout(self):
+        from braincompiler import create_linker
+        code = """
+            string s = "                ";
+            int a;
+            int b = 3;
+            in a;
+            a *= b;
+            out a;
+        """
+        linker = create_linker(code, optimize=3)
+        inp = random.randbytes(1)
+        self.assertEqual(bytes([inp[0] * 3 % 256]), Interpreter()(linker.process(), inp))
+        self.assertEqual({"s", "a", "b"}, {i for i in linker.layout.keys() if not i.startswith("__stack")})
+        cells = [f for i, f in linker.layout.items() if i != "s"]
+        self.assertEqual(len(cells), len(set(cells)))
+
+        # below -O3 the layout is only counted when it is read
+        linker = create_linker(code)
+        linker.process()
+        self.assertIsNone(linker.layout_data)
+        self.assertEqual({"s", "a", "b"}, {i for i in linker.layout.keys() if not i.startswith("__stack")})
+        self.assertIsNotNone(linker.layout_data)
+
+    def test_stack_coloring(self):
+        from braincompiler import create_linker
+        code = """
+            int a;
+            int b;
+            in a;
+            case (a) {
+                1: { b = 3; }
+                2: { b = a; b <<= a; }
+            }
+            out b;
+        """
+        slots = []
+        for optimize in (2, 3):
+            linker = create_linker(code, optimize=optimize)
+            self.assertEqual(b"\x08", Interpreter()(linker.process(), b"\x02"))
+            slots.append(len([i for i in linker.layout.keys() if i.startswith("__stack")]))
+        self.assertLess(slots[1], slots[0])
+
+    def test_flushed_clear_loop(self):
+        # the update flushed by [ and the one merged into the collapsed loop are on the same cell, they must not be
+        # swept in one run
+        for update in ("a += 3;", "a = 3;"):
+            code = f"""
+                int b;
+                int a;
+                int c;
+                in a;
+                out c;
+                {update}
+                while (a) {{
+                    a -= 3;
+                }}
+                a += 1;
+                b += 1;
+                out b;
+                out a;
+            """
+            self.assertEqual(b"\x00\x01\x01", Interpreter()(self.compile_code(code), b"\x05"))
+
+    def test_flushed_other_cell(self):
+        # the loop clears c, the update of a flushed by [ must merge with the one after the loop in any layout
+        for names in itertools.permutations("abdc"):
+            code = "".join(f"int {i};" for i in names) + """
+                in a;
+                in c;
+                in d;
+                out d;
+                a = 3;
+                while (c) {
+                    c -= 3;
+                }
+                a += 1;
+                b += 1;
+                out b;
+                out a;
+            """
+            self.assertEqual(b"\x02\x01\x04", Interpreter()(self.compile_code(code), b"\x01\x06\x02"))
+
+
+class RuntimeTests(TestCase):
+    from braincompiler import compile_code
+    compile_code = staticmethod(compile_code)
+
+    def test_ir(self):
+        runtime = CodeRuntime.from_code("[-]>[->++<<+>]<[>]")
+        self.assertEqual([SET, MOVE, MUL, MOVE, SCAN], runtime.ops)
+        self.assertEqual(((1, 2), (-1, 1)), runtime.mul_targets[0])
+        self.assertEqual(b"AB", run_code("++++++++[>++++++++<-]>+.+."))
+        self.assertEqual(b"\x02", run_code(",>,[-<+>]<.", b"\x01\x01"))
+
+    def test_compiled_program(self):
+        inp = random.randbytes(8)
+        code = """
+            string data = "        ";
+            int counter = 8;
+            int var;
+            while (counter){
+                counter -= 1;
+                in var;
+                data[counter] = var;
+            }
+            counter = 8;
+            while (counter){
+                counter -= 1;
+                var = data[counter];
+                var /= 3;
+                out var;
+            }
+        """
+        compiled = self.compile_code(code)
+        out = CodeRuntime.from_code(compiled).run(inp)
+        self.assertEqual(Interpreter()(compiled, inp), out)
+        self.assertEqual(bytes(i // 3 for i in inp), out)
+
+    def test_jit(self):
+        nested = "+++" + "[>+" * 40 + "-" + "]" * 40 + ">" * 40 + "+++."
+        self.assertEqual(run_code(nested), CodeJit.from_code(nested).run())
+
+        from braincompiler import CodeLexer, CodeParser, Preprocessor
+        inp = random.randbytes(4)
+        code = """
+            int a;
+            int b = 10;
+            int counter = 4;
+            while (counter){
+                counter -= 1;
+                in a;
+                a %= b;
+                out a;
+            }
+        """
+        parser = CodeParser(CodeLexer.tokens, CodeLexer.literals)
+        jit = CodeJit.from_file(parser.parse(input=code, lexer=Preprocessor()))
+        self.assertEqual(bytes(i % 10 for i in inp), jit.run(inp))
+        self.assertEqual(jit.code, CodeJit.from_code(self.compile_code(code)).code)
+
+    @skipUnless(shutil.which("cc"), "no C compiler")
+    def test_c_target(self):
+        inp = random.randbytes(4)
+        code = """
+            int a;
+            int tmp;
+            int b = 10;
+            int counter = 4;
+            while (counter){
+                counter -= 1;
+                in a;
+                a /= b;
+                goto a;
+                asm(">+<");
+                out a;
+                goto a;
+                asm("[-]>[-<+>]<");
+                out a;
+            }
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "code.c")
+            with open(source, "w") as f:
+                f.write(self.compile_code(code, optimize=2, target="c"))
+            subprocess.run(["cc", "-O1", "-o", os.path.join(tmp, "code"), source], check=True)
+            out = subprocess.run([os.path.join(tmp, "code")], input=inp, capture_output=True, check=True).stdout
+        self.assertEqual(bytes(f for i in inp for f in (i // 10, 1)), out)
+
+
+class MainTests(TestCase):
+    code = "int a = 200; int b = 100; out a; out b;\n" * 10
+
+    def run_main(self, *args: str) -> str:
+        from main import main
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "code.txt")
+            with open(source, "w") as f:
+                f.write(self.code)
+            main(["main.py", source, "-o", os.path.join(tmp, "code.bf"), *args])
+            with open(os.path.join(tmp, "code.bf")) as f:
+                return f.read()
+
+    def test_write_lines(self):
+        from main import write_lines
+        f = io.StringIO()
+        write_lines(["abc", "defgh", "", "ij"], f, 4)
+        self.assertEqual("abcd\nefgh\nij\n", f.getvalue())
+        f = io.StringIO()
+        write_lines(["abcd", "efgh"], f, 4)
+        self.assertEqual("abcd\nefgh\n", f.getvalue())
+        f = io.StringIO()
+        write_lines(["abc", "defgh"], f, 0)
+        self.assertEqual("abcdefgh", f.getvalue())
+
+    def test_width(self):
+        from braincompiler import compile_code
+        code = compile_code(self.code)
+        lines = self.run_main("-w", "30").split("\n")
+        self.assertEqual("", lines[-1])
+        self.assertTrue(all(len(i) == 30 for i in lines[:-2]))
+        self.assertEqual(code, "".join(lines))
+        self.assertEqual(code, self.run_main("--no-wrap"))
+        self.assertTrue(all(len(i) <= 100 for i in self.run_main().split("\n")))
+
+    def test_stdout(self):
+        from braincompiler import compile_code
+        from main import main
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "code.txt")
+            with open(source, "w") as f:
+                f.write(self.code)
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                main(["main.py", source, "-o", "-", "--no-wrap"])
+            self.assertEqual([], [i for i in os.listdir(tmp) if i != "code.txt"])
+        self.assertEqual(compile_code(self.code), out.getvalue())
+
+    def test_error_keeps_output(self):
+        from main import main
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "code.txt")
+            output = os.path.join(tmp, "code.bf")
+            with open(source, "w") as f:
+                f.write("string s = \"ab\"; out s[3];")
+            with open(output, "w") as f:
+                f.write("old")
+            self.assertRaises(Exception, main, ["main.py", source, "-o", output])
+            with open(output) as f:
+                self.assertEqual("old", f.read())
+            self.assertEqual(["code.bf", "code.txt"], sorted(os.listdir(tmp)))
+
+    def test_output_file(self):
+        from main import main, umask
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "code.txt")
+            output = os.path.join(tmp, "code.bf")
+            with open(source, "w") as f:
+                f.write(self.code)
+            main(["main.py", source, "-o", output])
+            self.assertEqual(0o666 & ~umask(), os.stat(output).st_mode & 0o777)
+            # the error opening the temporary file is the one raised
+            with patch("os.fdopen", side_effect=PermissionError("denied")):
+                self.assertRaisesRegex(PermissionError, "denied", main, ["main.py", source, "-o", output])
+            self.assertEqual(["code.bf", "code.txt"], sorted(os.listdir(tmp)))
+            self.assertRaises(FileNotFoundError, main, ["main.py", source, "-o", os.path.join(tmp, "a", "code.bf")])